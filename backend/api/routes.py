@@ -2,94 +2,139 @@ import json
 import logging
 import os
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Request, HTTPException, WebSocket, WebSocketDisconnect
-from pydantic import BaseModel
+import orjson
+from fastapi import APIRouter, Query, Request, Response, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
 
 # Import service and config
 try:
     from ..services.vector_search_service import VectorSearchService
     from ..core.config import Config
-except ImportError:
+    from ..utils.dres_client import DRESClient
+except (ImportError, ValueError):
     from services.vector_search_service import VectorSearchService
     from core.config import Config
+    from utils.dres_client import DRESClient
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# DRES settings are read once at import time
+_DRES_BASE_URL = os.getenv("DRES_BASE_URL", "http://192.168.28.151:5000")
+_DRES_USER = os.getenv("DRES_USERNAME")
+_DRES_PASS = os.getenv("DRES_PASSWORD")
+
+def _loads(body: bytes) -> Any:
+    """Decode a JSON request body with orjson, falling back to stdlib for non-UTF-8 payloads"""
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return json.loads(body.decode('cp1252', errors='replace'))
+
+async def read_body_fast(request: Request) -> bytes:
+    """Read the request body into a buffer preallocated from Content-Length"""
+    try:
+        content_length = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        content_length = 0
+    if content_length <= 0:
+        return await request.body()
+
+    buf = bytearray(content_length)
+    offset = 0
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        buf[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+        if not message.get("more_body", False):
+            break
+    return bytes(buf[:offset]) if offset != content_length else bytes(buf)
+
 # Pydantic Models for API
 class TextQuery(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
     First_query: str
     Next_query: str = ""
+    top_k: int = 100
+
+    @field_validator('top_k', mode='before')
+    @classmethod
+    def _default_top_k(cls, v):
+        # Clients send null or junk here; fall back to the default instead of rejecting
+        try:
+            return int(v)
+        except (ValueError, TypeError):
+            return 100
 
 class SequentialQueryRequest(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
     queries: List[str]
     top_k: int = 50
     require_all_steps: bool = False
     time_gap_constraints: Optional[List[Dict[str, int]]] = None
 
-class Filter(BaseModel):
-    name: str
-    number: str
-
-class FilterQuery(BaseModel):
-    filterText: Optional[str] = None
-    filters: List[Filter]
-    query: str
+async def _parse_body(request: Request, model: type) -> Any:
+    """Validate a JSON body with a Pydantic model, decoding it through _loads (cp1252 fallback)"""
+    try:
+        return model.model_validate(_loads(await read_body_fast(request)))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
 
 # Endpoints
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     service: VectorSearchService = websocket.app.state.service
     await websocket.accept()
-    service.active_connections.append(websocket)
+    service.active_connections.add(websocket)
     logger.info("WebSocket connection accepted")
 
     try:
         while True:
-            data = await websocket.receive_json()
-            if data['type'] == 'text_query':
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            # Accept both binary and text frames from the client
+            data = orjson.loads(message.get("bytes") or message.get("text") or b"{}")
+            if data.get('type') == 'text_query':
                 result = await service.process_temporal_query(
                     data['firstQuery'],
                     data.get('secondQuery', '')
                 )
-                await websocket.send_json({"kq": result})
+                await websocket.send_bytes(orjson.dumps({"kq": result}, option=orjson.OPT_SERIALIZE_NUMPY))
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
-        if websocket in service.active_connections:
-            service.active_connections.remove(websocket)
+        service.active_connections.discard(websocket)
     except Exception as e:
         logger.error(f"Error in WebSocket: {str(e)}")
-        if websocket in service.active_connections:
-            service.active_connections.remove(websocket)
+        service.active_connections.discard(websocket)
 
 @router.post("/TextQuery")
-async def text_query_endpoint(request: Request):
+async def text_query_endpoint(
+    request: Request,
+    top_k: Optional[int] = Query(None, ge=1, le=1000, description="Number of results; overrides top_k in the body")
+):
     service: VectorSearchService = request.app.state.service
+    q = await _parse_body(request, TextQuery)
+    if top_k is None:
+        top_k = q.top_k
     try:
-        body_bytes = await request.body()
-        try:
-            body_text = body_bytes.decode('utf-8')
-        except UnicodeDecodeError:
-            body_text = body_bytes.decode('cp1252', errors='replace')
-        
-        temporal_search = json.loads(body_text)
-        first_query = temporal_search['First_query']
-        next_query = temporal_search.get('Next_query', '')
-        
-        try:
-            top_k = int(temporal_search.get('top_k', 100))
-        except (ValueError, TypeError):
-            top_k = 100
-
         # process_temporal_query now handles SAT internally
-        result = await service.process_temporal_query(first_query, next_query, top_k=top_k)
+        result = await service.process_temporal_query(q.First_query, q.Next_query, top_k=top_k)
 
-        return {
+        return ORJSONResponse(content={
             "kq": result,
-            "fquery": first_query,
-            "nquery": next_query,
+            "fquery": q.First_query,
+            "nquery": q.Next_query,
             "total_results": len(result) if result else 0
-        }
+        })
     except Exception as e:
         logger.error(f"Error in text query: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -98,25 +143,18 @@ async def text_query_endpoint(request: Request):
 @router.post("/SequentialQuery")
 async def sequential_query_endpoint(request: Request):
     service: VectorSearchService = request.app.state.service
+    q = await _parse_body(request, SequentialQueryRequest)
+    if not q.queries:
+        raise HTTPException(status_code=400, detail="queries must be a non-empty array")
     try:
-        body = await request.body()
-        seq_request = json.loads(body)
-        queries = seq_request['queries']
-        top_k = seq_request.get('top_k', 50)
-        require_all_steps = seq_request.get('require_all_steps', False)
-        time_gap_constraints = seq_request.get('time_gap_constraints', None)
-        
-        if not queries or not isinstance(queries, list):
-            raise HTTPException(status_code=400, detail="queries must be a non-empty array")
-        
         # process_sequential_queries now handles SAT internally
         result = await service.process_sequential_queries(
-            queries=queries,
-            top_k=top_k,
-            require_all_steps=require_all_steps,
-            time_gap_constraints=time_gap_constraints
+            queries=q.queries,
+            top_k=q.top_k,
+            require_all_steps=q.require_all_steps,
+            time_gap_constraints=q.time_gap_constraints
         )
-        return result
+        return ORJSONResponse(content=result)
     except Exception as e:
         logger.error(f"Error in sequential query: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -125,7 +163,7 @@ async def sequential_query_endpoint(request: Request):
 async def get_neighbor_frames(request: Request):
     service: VectorSearchService = request.app.state.service
     try:
-        data = await request.json()
+        data = _loads(await read_body_fast(request))
         video = data.get('video')
         frame_id = data.get('frame_id')
         if not video or frame_id is None:
@@ -138,44 +176,33 @@ async def get_neighbor_frames(request: Request):
             stride=data.get('stride', 25),
             keyframe_path=data.get('keyframe_path', '')
         )
-        return {"neighbors": result}
+        return ORJSONResponse(content={"neighbors": result})
     except Exception as e:
         logger.error(f"Error getting neighbor frames: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/config")
 async def get_config(request: Request):
-    config = request.app.state.config
-    return {
-        "model_config": {"clip_model": config.model.clip_model_name, "device": config.model.device},
-        "database_config": {"collection_name": config.database.collection_name, "search_limit": config.database.search_limit},
-        "server_config": {"max_workers": config.server.max_workers, "log_level": config.server.log_level}
-    }
+    # Config is read-only after startup; payload is serialized once in create_app
+    return Response(content=request.app.state.config_payload, media_type="application/json")
+
+_HEALTH_TEMPLATE = b'{"status":"healthy","models_loaded":true,"database_connected":true,"active_connections":%d}'
 
 @router.get("/health")
 async def health_check(request: Request):
     service: VectorSearchService = request.app.state.service
-    return {
-        "status": "healthy",
-        "models_loaded": True,
-        "database_connected": True,
-        "active_connections": len(service.active_connections)
-    }
+    return Response(content=_HEALTH_TEMPLATE % len(service.active_connections), media_type="application/json")
 
 
 @router.post("/validate_dres_session")
 async def validate_dres_session(request: Request):
     try:
-        try:
-            from ..utils.dres_client import DRESClient
-        except (ImportError, ValueError):
-            from utils.dres_client import DRESClient
-        data = await request.json()
+        data = _loads(await read_body_fast(request))
         session_id = data.get("session_id")
         if not session_id: return {"valid": False, "message": "Missing session_id"}
         
-        dres_url = data.get("dres_base_url") or os.getenv("DRES_BASE_URL", "http://192.168.28.151:5000")
-        client = DRESClient(base_url=dres_url, session_id=session_id)
+        dres_url = data.get("dres_base_url") or _DRES_BASE_URL
+        client = DRESClient(base_url=dres_url, session_id=session_id, client=request.app.state.dres_http)
         # Simplified validation
         return {"valid": len(session_id) > 10, "message": "Validated" if len(session_id) > 10 else "Invalid session"}
     except Exception as e:
@@ -184,29 +211,30 @@ async def validate_dres_session(request: Request):
 @router.post("/submit_to_dres")
 async def submit_to_dres(request: Request):
     try:
-        try:
-            from ..utils.dres_client import DRESClient
-        except (ImportError, ValueError):
-            from utils.dres_client import DRESClient
-        data = await request.json()
+        data = _loads(await read_body_fast(request))
         items = data.get("items", [])
         if not items: return {"success": False, "message": "No items"}
         
-        dres_url = data.get("dres_base_url") or os.getenv("DRES_BASE_URL", "http://192.168.28.151:5000")
+        dres_url = data.get("dres_base_url") or _DRES_BASE_URL
         client = DRESClient(
             base_url=dres_url, 
             session_id=data.get("session_id"),
-            username=os.getenv("DRES_USERNAME"),
-            password=os.getenv("DRES_PASSWORD")
+            username=_DRES_USER,
+            password=_DRES_PASS,
+            client=request.app.state.dres_http
         )
         
-        eval_id = data.get("evaluation_id") or client.get_evaluation_id()
-        dres_items = client.format_search_results(items)
+        eval_id = data.get("evaluation_id") or await client.get_active_evaluation()
         
         if data.get("task_type") == "qa":
-            resp = client.submit_qa(evaluation_id=eval_id, results=dres_items, answer_text=data.get("answer_text", ""))
+            resp = await client.submit_qa(
+                items[0],
+                question=data.get("question", ""),
+                answer=data.get("answer_text") or None,
+                evaluation_id=eval_id
+            )
         else:
-            resp = client.submit_kis(evaluation_id=eval_id, results=dres_items)
+            resp = await client.submit_kis(items, evaluation_id=eval_id)
             
         return {"success": True, "message": "Submitted", "dres_response": resp}
     except Exception as e:
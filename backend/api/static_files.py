@@ -0,0 +1,53 @@
+import os
+import stat
+from functools import lru_cache
+
+import anyio
+from starlette.responses import FileResponse, PlainTextResponse
+
+
+class FastStaticApp:
+    """Minimal ASGI app for serving immutable files (keyframes, thumbnails)
+
+    Unlike StaticFiles, URL -> realpath resolution is cached, so hot keyframes
+    skip the per-request realpath walk. The file is still stat'ed on every
+    request (in a worker thread), because keyframes can be re-extracted while
+    the server runs and a stale stat would send the wrong Content-Length/ETag.
+    FileResponse uses the server's pathsend extension for zero-copy transfer
+    when it is advertised.
+    """
+
+    def __init__(self, directory: str, cache_size: int = 100_000):
+        self.directory = os.path.realpath(directory)
+        self._resolve = lru_cache(maxsize=cache_size)(self._resolve_uncached)
+
+    def _resolve_uncached(self, rel_path: str) -> str:
+        # Paths escaping the directory raise instead of returning None so they are never cached
+        full_path = os.path.realpath(os.path.join(self.directory, rel_path))
+        if not full_path.startswith(self.directory + os.sep):
+            raise FileNotFoundError(rel_path)
+        return full_path
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+            await response(scope, receive, send)
+            return
+
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+
+        try:
+            full_path = self._resolve(path.lstrip("/"))
+            st = await anyio.to_thread.run_sync(os.stat, full_path)
+            if not stat.S_ISREG(st.st_mode):
+                raise FileNotFoundError(full_path)
+        except (OSError, ValueError):
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            response = FileResponse(full_path, stat_result=st, method=scope["method"])
+        await response(scope, receive, send)
@@ -1,19 +1,64 @@
 import os
-import subprocess
-import json
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from pathlib import Path
+import numpy as np
+import orjson
 
-def get_fps(video_path):
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+MAX_CONCURRENT_PROBES = 64
+
+def get_fps_av(video_path):
+    """Read average frame rate in-process with libavformat (no fork/exec)"""
+    with av.open(video_path, metadata_errors='ignore') as container:
+        return float(container.streams.video[0].average_rate)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def histogram(fps, bins):
+        """Count fps values per [bins[i], bins[i+1]) bucket"""
+        n_bins = bins.shape[0] - 1
+        # Bucket lookup runs in parallel; counting is serial to avoid write races
+        idx = np.empty(fps.shape[0], np.int64)
+        for i in prange(fps.shape[0]):
+            idx[i] = np.searchsorted(bins, fps[i], side='right') - 1
+        out = np.zeros(n_bins, np.int64)
+        for i in range(idx.shape[0]):
+            if 0 <= idx[i] < n_bins:
+                out[idx[i]] += 1
+        return out
+else:
+    def histogram(fps, bins):
+        """Count fps values per [bins[i], bins[i+1]) bucket"""
+        return np.histogram(fps, bins=bins)[0]
+
+async def get_fps_ffprobe(video_path):
     cmd = [
-        'ffprobe', 
-        '-v', 'error', 
-        '-select_streams', 'v:0', 
-        '-show_entries', 'stream=avg_frame_rate', 
-        '-of', 'default=noprint_wrappers=1:nokey=1', 
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=avg_frame_rate',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
         video_path
     ]
     try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode('utf-8').strip()
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        out, _ = await proc.communicate()
+        output = out.decode('utf-8').strip()
         if '/' in output:
             num, den = map(int, output.split('/'))
             return num / den
@@ -21,14 +66,26 @@ def get_fps(video_path):
     except Exception as e:
         return None
 
-def process_video(line):
-    path = line.strip()
-    if not path: return None
+async def get_fps(video_path):
+    if AV_AVAILABLE:
+        try:
+            # libav releases the GIL during I/O, so worker threads probe in parallel
+            return await asyncio.to_thread(get_fps_av, video_path)
+        except Exception:
+            pass
+    return await get_fps_ffprobe(video_path)
+
+async def process_video(path, sem):
     filename = os.path.basename(path)
     video_id = os.path.splitext(filename)[0]
-    fps = get_fps(path)
+    async with sem:
+        fps = await get_fps(path)
     return video_id, fps
 
+async def audit(paths):
+    sem = asyncio.Semaphore(MAX_CONCURRENT_PROBES)
+    return await asyncio.gather(*(process_video(p, sem) for p in paths))
+
 video_list_file = 'all_videos.txt'
 if not os.path.exists(video_list_file):
     print("all_videos.txt not found")
@@ -37,25 +94,24 @@ if not os.path.exists(video_list_file):
 with open(video_list_file, 'r') as f:
     lines = f.readlines()
 
-print(f"Auditing {len(lines)} videos...")
+# Deduplicate while preserving order so each video is probed once
+paths = list(dict.fromkeys(line.strip() for line in lines if line.strip()))
 
-video_fps_map = {}
-with ThreadPoolExecutor(max_workers=8) as executor:
-    results = list(executor.map(process_video, lines))
+print(f"Auditing {len(paths)} videos...")
 
-for res in results:
-    if res:
-        vid, fps = res
-        if fps:
-            video_fps_map[vid] = fps
+results = asyncio.run(audit(paths))
+video_fps_map = {vid: fps for vid, fps in results if fps}
 
-with open('video_fps_map.json', 'w') as f:
-    json.dump(video_fps_map, f, indent=2)
+Path('video_fps_map.json').write_bytes(orjson.dumps(video_fps_map, option=orjson.OPT_INDENT_2))
 
 print(f"Done. Saved {len(video_fps_map)} entries to video_fps_map.json")
 
 # Summary of FPS counts
-fps_counts = {}
-for fps in video_fps_map.values():
-    fps_counts[fps] = fps_counts.get(fps, 0) + 1
-print("FPS Summary:", fps_counts)
+# float64 keeps keys identical to the values stored in video_fps_map.json
+fps_arr = np.fromiter(video_fps_map.values(), dtype=np.float64, count=len(video_fps_map))
+if fps_arr.size:
+    values = np.unique(fps_arr)
+    counts = histogram(fps_arr, np.append(values, values[-1] + 1.0))
+    fps_counts = dict(zip(values.tolist(), counts.tolist()))
+    print("FPS Summary:", fps_counts)
+    print(f"FPS min={values[0]:.3f} max={values[-1]:.3f} mode={values[np.argmax(counts)]:.3f}")
@@ -1,9 +1,10 @@
 import os
 import json
 import logging
-from dataclasses import dataclass
-from typing import Optional
-import torch
+from dataclasses import dataclass, fields
+from typing import Optional, Union, get_args, get_origin, get_type_hints
+import ctypes
+import sys
 
 @dataclass
 class ModelConfig:
@@ -12,6 +13,7 @@ class ModelConfig:
     clip_pretrained: str = "dfn5b"
     device: str = "cuda"  # auto-detected if cuda available
     clip_checkpoint_path: Optional[str] = None  # Path to local checkpoint file
+    int8_quantize: bool = False  # INT8 Linear weights (bitsandbytes on GPU, dynamic quantization on CPU)
 
 @dataclass
 class DatabaseConfig:
@@ -22,6 +24,8 @@ class DatabaseConfig:
     collection_name: str = "AIC_2024_1"
     search_limit: int = 3000
     replica_number: int = 1
+    milvus_concurrency: int = 16  # Worker threads for blocking Milvus calls
+    search_nprobe: int = 16  # Cells probed when the vector index is IVF-based
 
 @dataclass
 class ServerConfig:
@@ -29,7 +33,48 @@ class ServerConfig:
     cors_origins: str = "http://localhost:8007,https://localhost:8005,https://localhost:8443"
     max_workers: int = 4
     log_level: str = "INFO"
-    gzip_minimum_size: int = 1000
+    gzip_minimum_size: int = 4096
+
+def _cuda_driver_present() -> bool:
+    """Check for the CUDA driver without importing torch
+
+    Loading the driver library is cheap; the heavy CUDA context is only created
+    later when the service moves the model to the GPU.
+    """
+    lib = "nvcuda.dll" if sys.platform == "win32" else "libcuda.so.1"
+    try:
+        ctypes.CDLL(lib)
+        return True
+    except OSError:
+        return os.path.exists("/proc/driver/nvidia/version")
+
+def _cfg(config_data: dict, env: str, key: str, default, cast=str):
+    """Resolve a setting: env var first, then config file, then default"""
+    value = os.getenv(env)
+    if value in (None, ""):
+        value = config_data.get(key, default)
+    return cast(value) if value is not None else None
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+def _build(cls, config_data: dict, spec: dict):
+    """Instantiate a config dataclass, casting each value to its annotated type"""
+    hints = get_type_hints(cls)
+    kwargs = {}
+    for f in fields(cls):
+        if f.name not in spec:
+            continue
+        cast = hints[f.name]
+        if get_origin(cast) is Union:  # Optional[X] -> X
+            cast = next(a for a in get_args(cast) if a is not type(None))
+        if cast is bool:
+            cast = _to_bool
+        env, key = spec[f.name]
+        kwargs[f.name] = _cfg(config_data, env, key, f.default, cast)
+    return cls(**kwargs)
 
 class Config:
     """Main configuration class that loads from environment variables or config file"""
@@ -43,31 +88,35 @@ class Config:
             config_data = {}
 
         # Initialize configurations with env variables or config file values
-        self.model = ModelConfig(
-            clip_model_name=os.getenv("CLIP_MODEL_NAME", config_data.get("clip_model_name", "ViT-H-14-378-quickgelu")),
-            clip_pretrained=os.getenv("CLIP_PRETRAINED", config_data.get("clip_pretrained", "dfn5b")),
-            device=os.getenv("DEVICE", config_data.get("device", "cuda")),
-            clip_checkpoint_path=os.getenv("CLIP_CHECKPOINT_PATH", config_data.get("clip_checkpoint_path"))
-        )
+        # (field -> (env var, config file key); defaults come from the dataclasses)
+        self.model = _build(ModelConfig, config_data, {
+            "clip_model_name": ("CLIP_MODEL_NAME", "clip_model_name"),
+            "clip_pretrained": ("CLIP_PRETRAINED", "clip_pretrained"),
+            "device": ("DEVICE", "device"),
+            "clip_checkpoint_path": ("CLIP_CHECKPOINT_PATH", "clip_checkpoint_path"),
+            "int8_quantize": ("INT8_QUANTIZE", "int8_quantize"),
+        })
 
-        self.database = DatabaseConfig(
-            host=os.getenv("MILVUS_HOST", config_data.get("milvus_host", "192.168.20.156")),
-            port=int(os.getenv("MILVUS_PORT", config_data.get("milvus_port", 19530))),
-            database=os.getenv("MILVUS_DATABASE", config_data.get("milvus_database", "default")),
-            collection_name=os.getenv("COLLECTION_NAME", config_data.get("collection_name", "AIC_2024_1")),
-            search_limit=int(os.getenv("SEARCH_LIMIT", config_data.get("search_limit", 3000))),
-            replica_number=int(os.getenv("REPLICA_NUMBER", config_data.get("replica_number", 1)))
-        )
+        self.database = _build(DatabaseConfig, config_data, {
+            "host": ("MILVUS_HOST", "milvus_host"),
+            "port": ("MILVUS_PORT", "milvus_port"),
+            "database": ("MILVUS_DATABASE", "milvus_database"),
+            "collection_name": ("COLLECTION_NAME", "collection_name"),
+            "search_limit": ("SEARCH_LIMIT", "search_limit"),
+            "replica_number": ("REPLICA_NUMBER", "replica_number"),
+            "milvus_concurrency": ("MILVUS_CONCURRENCY", "milvus_concurrency"),
+            "search_nprobe": ("SEARCH_NPROBE", "search_nprobe"),
+        })
 
-        self.server = ServerConfig(
-            cors_origins=os.getenv("CORS_ORIGINS", config_data.get("cors_origins", "http://localhost:8007,https://localhost:8005,https://localhost:8443")),
-            max_workers=int(os.getenv("MAX_WORKERS", config_data.get("max_workers", 4))),
-            log_level=os.getenv("LOG_LEVEL", config_data.get("log_level", "INFO")),
-            gzip_minimum_size=int(os.getenv("GZIP_MIN_SIZE", config_data.get("gzip_minimum_size", 1000)))
-        )
+        self.server = _build(ServerConfig, config_data, {
+            "cors_origins": ("CORS_ORIGINS", "cors_origins"),
+            "max_workers": ("MAX_WORKERS", "max_workers"),
+            "log_level": ("LOG_LEVEL", "log_level"),
+            "gzip_minimum_size": ("GZIP_MIN_SIZE", "gzip_minimum_size"),
+        })
 
         # Auto-detect device if cuda specified but not available
-        if self.model.device == "cuda" and not torch.cuda.is_available():
+        if self.model.device == "cuda" and not _cuda_driver_present():
             self.model.device = "cpu"
             logging.warning("CUDA requested but not available, falling back to CPU")
         
@@ -1,18 +1,92 @@
 import os
 import logging
-
-# Module-level suppression to catch watchfiles logs in the supervisor process
-logging.getLogger("watchfiles").setLevel(logging.WARNING)
+import logging.config
 import sys
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+import orjson
+import httpx
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from core.config import Config
 from services.vector_search_service import VectorSearchService
 from api.routes import router
+from api.static_files import FastStaticApp
+
+try:
+    from brotli_asgi import BrotliMiddleware
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# uvloop is not available on Windows; fall back to the stdlib asyncio loop there
+try:
+    import uvloop
+    uvloop.install()
+    EVENT_LOOP = "uvloop"
+except ImportError:
+    EVENT_LOOP = "asyncio"
+
+class PrecomputedCORSMiddleware:
+    """Pure-ASGI CORS handler with response headers built once at startup"""
+
+    def __init__(self, app, allow_origins, allow_methods, allow_headers, allow_credentials=True, max_age=3600):
+        self.app = app
+        self.allow_all_origins = "*" in allow_origins
+        self.allow_origins = frozenset(allow_origins)
+        self._simple_headers = [(b"vary", b"Origin")]
+        if allow_credentials:
+            self._simple_headers.append((b"access-control-allow-credentials", b"true"))
+        self._preflight_headers = self._simple_headers + [
+            (b"access-control-allow-methods", ", ".join(allow_methods).encode()),
+            (b"access-control-allow-headers", ", ".join(allow_headers).encode()),
+            (b"access-control-max-age", str(max_age).encode()),
+            (b"content-length", b"2"),
+            (b"content-type", b"text/plain; charset=utf-8"),
+        ]
+
+    def _is_allowed(self, origin: bytes) -> bool:
+        return self.allow_all_origins or origin.decode("latin-1").lower() in self.allow_origins
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        origin = headers.get(b"origin")
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Preflight: answer directly without touching the app
+        if scope["method"] == "OPTIONS" and b"access-control-request-method" in headers:
+            if self._is_allowed(origin):
+                status, body = 200, b"OK"
+                response_headers = self._preflight_headers + [(b"access-control-allow-origin", origin)]
+            else:
+                status, body = 400, b"Disallowed CORS origin"
+                response_headers = [(b"content-type", b"text/plain; charset=utf-8")]
+            await send({"type": "http.response.start", "status": status, "headers": response_headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        if not self._is_allowed(origin):
+            await self.app(scope, receive, send)
+            return
+
+        cors_headers = self._simple_headers + [(b"access-control-allow-origin", origin)]
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *cors_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
 
 def create_app(config_file: str = None) -> FastAPI:
     """Create and configure FastAPI application"""
@@ -22,7 +96,7 @@ def create_app(config_file: str = None) -> FastAPI:
     log_file = Path(__file__).parent / "data" / "cache" / "backend_server.log"
     log_file.parent.mkdir(parents=True, exist_ok=True)
     
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
     
     # File handler
     file_handler = logging.FileHandler(log_file, encoding='utf-8')
@@ -32,24 +106,26 @@ def create_app(config_file: str = None) -> FastAPI:
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
     
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-    
-    # Clear existing handlers to avoid duplicates
-    if root_logger.hasHandlers():
-        root_logger.handlers.clear()
-        
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
-    
-    # Suppress verbose watchfiles logs (prevents "X change detected" spam)
-    logging.getLogger("watchfiles").setLevel(logging.WARNING)
+    # Handlers run on a listener thread so disk writes never block the event loop
+    log_queue = queue.SimpleQueue()
+    log_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
     
-    # Ensure uvicorn logs go to our handlers
-    for logger_name in ["uvicorn", "uvicorn.error"]:
-        l = logging.getLogger(logger_name)
-        l.handlers = [file_handler, console_handler]
-        l.propagate = False
+    # Single declarative setup: replaces root handlers, routes uvicorn through the queue
+    # and silences watchfiles ("X change detected" spam) in both supervisor and workers
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {'queue': {'()': QueueHandler, 'queue': log_queue}},
+        'root': {'level': 'INFO', 'handlers': ['queue']},
+        'loggers': {
+            'watchfiles': {'level': 'WARNING'},
+            'uvicorn': {'handlers': ['queue'], 'propagate': False},
+            'uvicorn.error': {'handlers': ['queue'], 'propagate': False},
+            'uvicorn.access': {'level': 'WARNING'},
+        },
+    })
+    root_logger = logging.getLogger()
         
     root_logger.info(f"Backend starting. Global log file: {log_file}")
     
@@ -59,17 +135,31 @@ def create_app(config_file: str = None) -> FastAPI:
     app = FastAPI(
         title="Vector Search Service",
         description="Modularized high-performance vector search service",
-        version="2.0.0"
+        version="2.0.0",
+        default_response_class=ORJSONResponse
     )
 
     # Store config and service in app state for access in routes
     app.state.config = config
     app.state.service = service
+    app.state.log_listener = log_listener
+    app.add_event_handler("shutdown", log_listener.stop)
 
-    # Configure CORS
-    origins = config.server.cors_origins.split(",")
+    # One pooled HTTP/2 client for all DRES calls (avoids a TCP/TLS handshake per submission)
+    app.state.dres_http = httpx.AsyncClient(http2=True, timeout=10.0)
+    app.add_event_handler("shutdown", app.state.dres_http.aclose)
+
+    # Precompute the /config payload once; config does not change after startup
+    app.state.config_payload = orjson.dumps({
+        "model_config": {"clip_model": config.model.clip_model_name, "device": config.model.device},
+        "database_config": {"collection_name": config.database.collection_name, "search_limit": config.database.search_limit},
+        "server_config": {"max_workers": config.server.max_workers, "log_level": config.server.log_level}
+    })
+
+    # Configure CORS (normalize once so per-request matching is a set lookup)
+    origins = tuple(dict.fromkeys(o.strip().lower() for o in config.server.cors_origins.split(",") if o.strip()))
     app.add_middleware(
-        CORSMiddleware,
+        PrecomputedCORSMiddleware,
         allow_origins=origins,
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE"],
@@ -77,11 +167,18 @@ def create_app(config_file: str = None) -> FastAPI:
         max_age=3600,
     )
 
-    # Add GZip compression
-    app.add_middleware(
-        GZipMiddleware,
-        minimum_size=config.server.gzip_minimum_size
-    )
+    # Add response compression (Brotli q4 is faster than GZip at a similar ratio)
+    if BROTLI_AVAILABLE:
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=4,
+            minimum_size=config.server.gzip_minimum_size
+        )
+    else:
+        app.add_middleware(
+            GZipMiddleware,
+            minimum_size=config.server.gzip_minimum_size
+        )
 
     # Mount static files
     base_dir = Path(__file__).parent.parent
@@ -91,14 +188,15 @@ def create_app(config_file: str = None) -> FastAPI:
 
     if video_path.exists():
         app.mount("/videos", StaticFiles(directory=str(video_path)), name="videos")
+    # Keyframes/thumbnails are the hottest static paths; serve them with cached path resolution
     if keyframes_path.exists():
-        app.mount("/keyframes", StaticFiles(directory=str(keyframes_path)), name="keyframes")
+        app.mount("/keyframes", FastStaticApp(str(keyframes_path)), name="keyframes")
     
     # Fallback: Serve keyframes at /thumbnails if thumbnails folder is deleted
     if thumbnails_path.exists():
-        app.mount("/thumbnails", StaticFiles(directory=str(thumbnails_path)), name="thumbnails")
+        app.mount("/thumbnails", FastStaticApp(str(thumbnails_path)), name="thumbnails")
     elif keyframes_path.exists():
-        app.mount("/thumbnails", StaticFiles(directory=str(keyframes_path)), name="thumbnails")
+        app.mount("/thumbnails", FastStaticApp(str(keyframes_path)), name="thumbnails")
 
     # Include routes
     app.include_router(router)
@@ -126,4 +224,12 @@ if __name__ == "__main__":
         
     log_config["disable_existing_loggers"] = False
     
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, log_config=log_config, reload=True)
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        log_config=log_config,
+        loop=EVENT_LOOP,
+        http="httptools",
+        reload=True
+    )
\ No newline at end of file
@@ -5,21 +5,45 @@ import logging
 import asyncio
 import hashlib
 import re
+import struct
+import sys
+import threading
 from io import BytesIO
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Set
 from pathlib import Path
-from collections import defaultdict
-from functools import lru_cache
+from bisect import bisect_left, bisect_right
+from collections import deque
+from functools import lru_cache, partial
 import concurrent.futures
 
 import torch
 import torch.nn.functional as F
 import numpy as np
+import orjson
 from PIL import Image
 import open_clip
-from pymilvus import MilvusClient
+from pymilvus import MilvusClient, DataType
 from fastapi import HTTPException, WebSocket
 
+try:
+    import bitsandbytes as bnb
+    BNB_AVAILABLE = True
+except ImportError:
+    BNB_AVAILABLE = False
+
+try:
+    from transformers import CLIPTokenizerFast
+    FAST_TOKENIZER_AVAILABLE = True
+except ImportError:
+    FAST_TOKENIZER_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
 # Import configuration and translator
 try:
     from .core.config import Config
@@ -31,6 +55,242 @@ try:
 except (ImportError, ValueError):
     from utils.translator import get_translator
 
+# Accent-stripping table for OCR matching (built once, applied in a single C-level pass)
+_VIET_TRANSLATE = str.maketrans({
+    'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a', 'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ẩ': 'a', 'ẫ': 'a', 'ậ': 'a',
+    'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ẳ': 'a', 'ẵ': 'a', 'ặ': 'a',
+    'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e', 'ê': 'e', 'ề': 'e', 'ế': 'e', 'ể': 'e', 'ễ': 'e', 'ệ': 'e',
+    'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
+    'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o', 'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ổ': 'o', 'ỗ': 'o', 'ộ': 'o',
+    'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ở': 'o', 'ỡ': 'o', 'ợ': 'o',
+    'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u', 'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ử': 'u', 'ữ': 'u', 'ự': 'u',
+    'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y', 'đ': 'd'
+})
+
+# Keyword extraction: compiled once instead of on every call
+# Keyframe files are named <frame_id>.jpg
+_FRAME_FILE_RE = re.compile(r'([0-9]+)\.jpg')
+_KEYWORD_CLEAN_RE = re.compile(r'[^\w\sÀÁÂÃÈÉÊÌÍÒÓÔÕÙÚĂĐĨŨƠàáâãèéêìíòóôõùúăđĩũơƯĂẠẢẤẦẨẪẬẮẰẲẴẶẸẺẼỀỀỂưăạảấầẩẫậắằẳẵặẹẻẽềềểỄỆỈỊỌỎỐỒỔỖỘỚỜỞỠỢỤỦỨỪễệỉịọỏốồổỗộớờởỡợụủứừỬỮỰỲỴÝỶỸửữựỳỵýỷỹ]')
+
+VIETNAMESE_STOPWORDS = frozenset({
+    'và', 'của', 'có', 'được', 'cho', 'với', 'trong', 'từ', 'đã', 'sẽ',
+    'các', 'này', 'đó', 'những', 'một', 'để', 'là', 'như', 'về', 'ở',
+    'khi', 'bị', 'vào', 'ra', 'đến', 'thì', 'hoặc', 'nhưng', 'mà',
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
+    'of', 'with', 'by', 'from', 'as', 'is', 'are', 'was', 'were', 'be'
+})
+
+def normalize_vietnamese(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics"""
+    return text.lower().translate(_VIET_TRANSLATE)
+
+_ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+HISTORY_MAX_ENTRIES = 1000
+
+# Embedding store header: magic + row width D, followed by float16 [N, D] rows
+_EMBEDDING_HEADER = struct.Struct('<4sI')
+_EMBEDDING_MAGIC = b'CEF1'
+
+# Rerank images are scored in fixed-size batches (sized for 4GB VRAM); the last
+# batch is zero-padded so a compiled encode_image never sees a new shape
+RERANK_BATCH_SIZE = 8
+
+# Inputs on which the fast CLIP tokenizer must match open_clip's before it is swapped in:
+# entities, odd whitespace, accents/punctuation, digits and an over-length string
+_TOKENIZER_PROBES = (
+    "a man riding a bicycle in the rain",
+    "news anchor &amp; guest  in   the studio",
+    "café façade, naïve — “quoted” text!",
+    "Scoreboard 3-2 at 12:45 PM",
+    " ".join(["a crowd of people waving red flags on the street"] * 12),
+)
+
+# Text-encode batches are padded up to one of these sizes so a compiled encode_text
+# (dynamic=False) sees a handful of shapes rather than one per miss count
+TEXT_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+def _diversity_select(video_ids, frames, n_videos, min_gap_frames, max_per_video, max_results):
+    """Return indices of results kept by the diversity filter, in selection order"""
+    n = video_ids.shape[0]
+    counts = np.zeros(n_videos, np.int64)
+    last_frame = np.zeros(n_videos, np.int64)
+    has_last = np.zeros(n_videos, np.bool_)
+    taken = np.zeros(n, np.bool_)
+    order = np.empty(n, np.int64)
+    n_selected = 0
+
+    # Pass 1: per-video cap and minimum frame gap from the last kept frame
+    for i in range(n):
+        if n_selected >= max_results: break
+        v = video_ids[i]
+        if counts[v] >= max_per_video: continue
+        if has_last[v] and abs(frames[i] - last_frame[v]) < min_gap_frames: continue
+        taken[i] = True
+        order[n_selected] = i
+        n_selected += 1
+        counts[v] += 1
+        last_frame[v] = frames[i]
+        has_last[v] = True
+
+    # Pass 2: top up with a relaxed per-video cap if not enough results survived
+    if n_selected < max_results:
+        for i in range(n):
+            if taken[i]: continue
+            v = video_ids[i]
+            if counts[v] < max_per_video + 5:
+                taken[i] = True
+                order[n_selected] = i
+                n_selected += 1
+                counts[v] += 1
+                if n_selected >= max_results: break
+    return order[:n_selected]
+
+def _score_paths(distances, steps_flat, offsets, num_steps, require_all):
+    """Score sequential paths from CSR-packed matched steps; returns (score, similarity, coherence)
+
+    Paths rejected by require_all get a score of -inf.
+    """
+    n = distances.shape[0]
+    scores = np.empty(n, np.float64)
+    similarity = np.empty(n, np.float64)
+    coherence = np.zeros(n, np.float64)
+    for i in prange(n):
+        lo = offsets[i]
+        hi = offsets[i + 1]
+        num_matched = hi - lo
+        similarity[i] = 1.0 - distances[i]
+        if require_all and num_matched < num_steps:
+            scores[i] = -np.inf
+            continue
+        if num_matched > 1:
+            consecutive = 0
+            for j in range(lo, hi - 1):
+                if steps_flat[j + 1] == steps_flat[j] + 1:
+                    consecutive += 1
+            coherence[i] = consecutive / (num_steps - 1)
+        scores[i] = (num_matched / num_steps) * 0.5 + similarity[i] * 0.4 + coherence[i] * 0.1
+    return scores, similarity, coherence
+
+if NUMBA_AVAILABLE:
+    _diversity_select = njit(cache=True)(_diversity_select)
+    _score_paths = njit(parallel=True, fastmath=True, cache=True)(_score_paths)
+
+# Milvus handles shared by every service instance in the process: (uri, db) -> client,
+# and the collections already confirmed loaded through it
+_milvus_clients: Dict[Tuple[str, str], MilvusClient] = {}
+_loaded_collections: Set[Tuple[str, str, str]] = set()
+_milvus_lock = threading.Lock()
+
+# CLIP weights are shared the same way: a second service in the process (tests, tools)
+# reuses the loaded model instead of rebuilding it
+_clip_models: Dict[Tuple, Tuple[Any, Any, Any]] = {}
+_clip_lock = threading.Lock()
+
+def get_milvus_client(uri: str, db: str) -> MilvusClient:
+    """Process-wide MilvusClient per (uri, db)"""
+    with _milvus_lock:
+        client = _milvus_clients.get((uri, db))
+        if client is None:
+            client = _milvus_clients[(uri, db)] = MilvusClient(uri=uri, db=db)
+        return client
+
+def ensure_collection_loaded(client: MilvusClient, uri: str, db: str, collection_name: str, replica_number: int = 1) -> bool:
+    """Load a collection unless it is already loaded; returns True if load_collection was called"""
+    key = (uri, db, collection_name)
+    with _milvus_lock:
+        if key in _loaded_collections: return False
+        state = client.get_load_state(collection_name=collection_name).get("state")
+        loaded = getattr(state, "name", str(state)) == "Loaded"
+        if not loaded:
+            client.load_collection(collection_name=collection_name, replica_number=replica_number)
+        _loaded_collections.add(key)
+        return not loaded
+
+# Fields temporal scoring reads from a hit; searches whose hits are never displayed fetch only these
+SCORING_FIELDS = ['video', 'frame_id']
+
+# Frames after a first-query hit within which a second-query hit boosts it
+TEMPORAL_WINDOW_FRAMES = 1500
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _temporal_boost_sorted(fk_video, fk_frame, nk_video, nk_frame, nk_score, window):
+        """Per first hit, best linearly-decayed second-hit score in (frame, frame + window] of the same video
+
+        nk_* must be sorted by (video, frame).
+        """
+        n = fk_frame.shape[0]
+        boost = np.zeros(n, np.float64)
+        for i in prange(n):
+            v = fk_video[i]
+            lo = np.searchsorted(nk_video, v, side='left')
+            hi = np.searchsorted(nk_video, v, side='right')
+            if lo == hi: continue
+            f = fk_frame[i]
+            start = lo + np.searchsorted(nk_frame[lo:hi], f, side='right')
+            end = lo + np.searchsorted(nk_frame[lo:hi], f + window, side='right')
+            best = 0.0
+            for j in range(start, end):
+                value = nk_score[j] * (window - (nk_frame[j] - f)) / window
+                if value > best: best = value
+            boost[i] = best
+        return boost
+
+    def _temporal_boost(fk_video, fk_frame, nk_video, nk_frame, nk_score, window):
+        """Temporal boost for each first-query hit from same-video second-query hits"""
+        order = np.lexsort((nk_frame, nk_video))
+        return _temporal_boost_sorted(fk_video, fk_frame, nk_video[order], nk_frame[order], nk_score[order], window)
+else:
+    def _temporal_boost(fk_video, fk_frame, nk_video, nk_frame, nk_score, window):
+        """Temporal boost for each first-query hit from same-video second-query hits
+
+        Works one video at a time, so memory is sum(n_v * m_v) instead of the full N x M matrix.
+        """
+        boost = np.zeros(fk_frame.shape[0], np.float64)
+        fk_order = np.argsort(fk_video, kind='stable')
+        nk_order = np.argsort(nk_video, kind='stable')
+        nk_sorted = nk_video[nk_order]
+        videos, fk_start, fk_count = np.unique(fk_video[fk_order], return_index=True, return_counts=True)
+        nk_lo = np.searchsorted(nk_sorted, videos, side='left')
+        nk_hi = np.searchsorted(nk_sorted, videos, side='right')
+        for start, count, lo, hi in zip(fk_start.tolist(), fk_count.tolist(), nk_lo.tolist(), nk_hi.tolist()):
+            if lo == hi: continue
+            fi, ni = fk_order[start:start + count], nk_order[lo:hi]
+            frame_diff = nk_frame[ni][:, None] - fk_frame[fi][None, :]
+            valid = (frame_diff > 0) & (frame_diff <= window)
+            boost[fi] = np.where(valid, nk_score[ni][:, None] * (window - frame_diff) / window, 0.0).max(axis=0)
+        return boost
+
+# Fields never sent to the frontend: raw embeddings and the Milvus-side distance duplicate
+_FLATTEN_DROP = ('vector', 'distance')
+
+def _flatten_entity(entity: Dict[str, Any]) -> Dict[str, Any]:
+    """Hoist nested 'entity' dicts (some indexing scripts nest them) and drop _FLATTEN_DROP, in place"""
+    inner = entity.get('entity')
+    while isinstance(inner, dict):
+        del entity['entity']
+        entity.update(inner)
+        inner = entity.get('entity')
+    for key in _FLATTEN_DROP:
+        entity.pop(key, None)
+    return entity
+
+def _top_k_desc(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, highest first; ties keep their original order"""
+    if k >= scores.size: return np.argsort(-scores, kind='stable')
+    if k <= 0: return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+@lru_cache(maxsize=200_000)
+def _frame_time(frame_id: int, fps: float) -> Tuple[float, str]:
+    """(seconds, 'HH:MM:SS.mmm') for a frame; memoized since hot keyframes repeat across queries"""
+    seconds = float(frame_id) / fps
+    m, s = divmod(seconds, 60)
+    h, m = divmod(m, 60)
+    return seconds, f"{int(h):02d}:{int(m):02d}:{s:06.3f}"
+
 def log_execution_time(func):
     """Decorator to log function execution time"""
     async def wrapper(*args, **kwargs):
@@ -51,9 +311,15 @@ class VectorSearchService:
 
         # Initialize thread pool for CPU-bound tasks
         self.thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.config.server.max_workers)
+        # CLIP forwards serialize on the shared model/GPU anyway; a dedicated single
+        # worker keeps them from starving (or being starved by) other blocking work
+        self.clip_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-gpu")
+        # Milvus calls are blocking gRPC round-trips; their own pool lets concurrent requests
+        # overlap searches without competing with image preprocessing for thread_pool workers
+        self.milvus_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.config.database.milvus_concurrency, thread_name_prefix="milvus")
 
         # WebSocket connections
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
 
         # Common query cache for performance
         self.common_queries = ["person", "car", "building"]
@@ -89,10 +355,25 @@ class VectorSearchService:
 
         self.query_cache_dir = self.cache_dir / "queries"
         self.query_cache_dir.mkdir(exist_ok=True)
-        self.embedding_cache_file = self.cache_dir / "clip_embeddings.json"
-        self.embedding_cache = {}
+        # Embeddings are only valid for the model that produced them, so the store is namespaced
+        # by model identity; switching model/checkpoint starts a fresh cache instead of reusing stale rows
+        model_cfg = self.config.model
+        model_tag = self._hash_key(model_cfg.clip_model_name, model_cfg.clip_checkpoint_path or model_cfg.clip_pretrained, model_cfg.int8_quantize)[:12]
+        self.embedding_cache_file = self.cache_dir / f"clip_embeddings.{model_tag}.f16.bin"
+        self.embedding_keys_file = self.cache_dir / f"clip_embeddings.{model_tag}.keys.txt"
+        # Embeddings live in one [N, D] device matrix in the dtype the model produces;
+        # embedding_cache_index maps query -> row
+        self._embedding_dtype = torch.float16 if 'cuda' in str(self.device) else torch.float32
+        self.embedding_cache_matrix: Optional[torch.Tensor] = None
+        self.embedding_cache_index: Dict[str, int] = {}
+        # Serializes misses so concurrent requests for one query encode and append it once
+        self._embedding_lock = threading.Lock()
         self._load_embedding_cache()
-        self.history_file = self.cache_dir / "history.json"
+        self.history_file = self.cache_dir / "history.jsonl"
+        self._history_appends = 0
+        self._compact_history()
+        self.preproc_cache_dir = self.cache_dir / "clip_preproc"
+        self.preproc_cache_dir.mkdir(exist_ok=True)
         
         # Copy optimization flags from config to service
         self.enable_diversity_filter = getattr(config, 'enable_diversity_filter', False)
@@ -101,6 +382,9 @@ class VectorSearchService:
         self.diversity_max_per_video = getattr(config, 'diversity_max_per_video', 5)
         self.diversity_max_results = getattr(config, 'diversity_max_results', 50)
 
+        # Compile numba kernels now so the first query does not pay for it
+        self._warmup_kernels()
+
         # Initialize models and database connection
         self._initialize_models()
         self._initialize_database()
@@ -112,39 +396,130 @@ class VectorSearchService:
         self.thumbnails_base = Path(os.path.join(os.path.dirname(__file__), "..", "..", "data", "thumbnails")).absolute()
         self.keyframes_base = Path(os.path.join(os.path.dirname(__file__), "..", "..", "data", "keyframes")).absolute()
 
+        # Sorted keyframe ids per video directory for get_neighbors: path -> (mtime, ids)
+        self._frame_id_cache: Dict[str, Tuple[float, np.ndarray]] = {}
+
         # Load video FPS map
         self.video_fps_map = {}
         fps_map_path = Path(__file__).parent.parent / "video_fps_map.json"
         if fps_map_path.exists():
             try:
                 with open(fps_map_path, 'r', encoding='utf-8') as f:
-                    self.video_fps_map = json.load(f)
+                    # Keys are stored without '.mp4' so lookups need no per-call rewrite
+                    self.video_fps_map = {k.replace('.mp4', ''): v for k, v in json.load(f).items()}
                 self.logger.info(f"Loaded {len(self.video_fps_map)} entries from {fps_map_path.name}")
             except Exception as e:
                 self.logger.error(f"Failed to load video FPS map: {e}")
         else:
             self.logger.warning(f"Video FPS map not found at {fps_map_path}")
+        # The map is fixed for the process lifetime; memoize lookups per raw video id
+        self._fps_lookup = lru_cache(maxsize=4096)(self._fps_lookup_uncached)
+
+    def _warmup_kernels(self):
+        """Trigger numba compilation (or on-disk cache load) for the hot-path kernels"""
+        if not NUMBA_AVAILABLE: return
+        try:
+            _diversity_select(np.zeros(1, np.int64), np.zeros(1, np.int64), 1, 50, 5, 1)
+            _score_paths(np.zeros(1, np.float64), np.zeros(1, np.int64), np.array([0, 1], np.int64), 1, False)
+            _temporal_boost(np.zeros(1, np.int32), np.zeros(1, np.int64), np.zeros(1, np.int32), np.ones(1, np.int64), np.ones(1, np.float64), TEMPORAL_WINDOW_FRAMES)
+        except Exception as e:
+            self.logger.warning(f"Numba warmup failed: {e}")
 
     def _load_embedding_cache(self):
-        """Load CLIP embeddings from disk"""
-        if self.embedding_cache_file.exists():
-            try:
-                import torch
-                with open(self.embedding_cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Convert lists back to tensors
-                    self.embedding_cache = {k: torch.tensor(v).to(self.device).float() for k, v in data.items()}
-                    self.logger.info(f"Loaded {len(self.embedding_cache)} embeddings from persistent cache")
-            except Exception as e:
-                self.logger.warning(f"Failed to load persistent embedding cache: {e}")
+        """Load CLIP embeddings from the append-only store (float16 rows + key list)"""
+        self.logger.info(f"Embedding cache: {self.embedding_cache_file.name}")
+        if not self.embedding_cache_file.exists():
+            if self.embedding_keys_file.exists():
+                self._truncate_embedding_store([], 0)  # keys without rows would misalign later appends
+            return
+        try:
+            with open(self.embedding_cache_file, 'rb') as f:
+                header = f.read(_EMBEDDING_HEADER.size)
+            if len(header) < _EMBEDDING_HEADER.size or header[:4] != _EMBEDDING_MAGIC:
+                self.logger.warning(f"{self.embedding_cache_file.name} has no valid header; starting a fresh embedding cache")
+                self._truncate_embedding_store([], 0)
+                return
+            _, dim = _EMBEDDING_HEADER.unpack(header)
+            keys = self._read_embedding_keys()
+            row_bytes = dim * np.dtype(np.float16).itemsize
+            data_bytes = self.embedding_cache_file.stat().st_size - _EMBEDDING_HEADER.size
+            if data_bytes != len(keys) * row_bytes:
+                # Rows and keys are two separate appends; an interrupted or interleaved write
+                # leaves them out of step. Keep only the prefix both files agree on.
+                n = min(data_bytes // row_bytes, len(keys))
+                self.logger.warning(
+                    f"Embedding cache out of step ({data_bytes // row_bytes} rows, {len(keys)} keys); keeping first {n}"
+                )
+                keys = keys[:n]
+                self._truncate_embedding_store(keys, row_bytes)
+            if not keys:
+                return
+            matrix = np.memmap(self.embedding_cache_file, dtype=np.float16, mode='r', offset=_EMBEDDING_HEADER.size, shape=(len(keys), dim))
+            # Leave headroom so the next misses append without reallocating
+            self.embedding_cache_matrix = torch.empty((max(1024, 2 * len(keys)), dim), device=self.device, dtype=self._embedding_dtype)
+            self.embedding_cache_matrix[:len(keys)] = torch.from_numpy(np.array(matrix)).to(self.device, self._embedding_dtype)
+            self.embedding_cache_index = {k: i for i, k in enumerate(keys)}
+            self.logger.info(f"Loaded {len(self.embedding_cache_index)} embeddings from persistent cache")
+        except Exception as e:
+            self.logger.warning(f"Failed to load persistent embedding cache: {e}")
 
-    def _save_embedding_cache(self):
-        """Save CLIP embeddings to disk"""
+    def _read_embedding_keys(self) -> List[str]:
+        """Read the key list, stopping at a torn (partially written) last line"""
+        keys = []
+        if not self.embedding_keys_file.exists():
+            return keys
+        with open(self.embedding_keys_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith("\n"): break
+                try:
+                    keys.append(json.loads(line))
+                except ValueError:
+                    break
+        return keys
+
+    def _truncate_embedding_store(self, keys: List[str], row_bytes: int):
+        """Rewrite the store to exactly len(keys) rows so later appends stay aligned"""
+        if keys:
+            with open(self.embedding_cache_file, 'r+b') as f:
+                f.truncate(_EMBEDDING_HEADER.size + len(keys) * row_bytes)
+        else:
+            self.embedding_cache_file.unlink(missing_ok=True)
+        with open(self.embedding_keys_file, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(k, ensure_ascii=False) + "\n" for k in keys)
+
+    def _get_cached_embedding(self, query: str) -> Optional[torch.Tensor]:
+        """Return the cached [1, D] embedding row for a query, or None"""
+        row = self.embedding_cache_index.get(query)
+        if row is None: return None
+        return self.embedding_cache_matrix[row:row + 1]
+
+    def _cache_embedding(self, query: str, embedding: torch.Tensor) -> torch.Tensor:
+        """Store a new embedding row in memory and on disk; returns the cached [1, D] row"""
+        embedding = embedding.detach().reshape(1, -1).to(self.device, self._embedding_dtype)
+        n = len(self.embedding_cache_index)
+        if self.embedding_cache_matrix is None:
+            self.embedding_cache_matrix = torch.empty((1024, embedding.shape[1]), device=self.device, dtype=self._embedding_dtype)
+        elif n >= self.embedding_cache_matrix.shape[0]:
+            # Geometric growth keeps appends amortized O(D)
+            grown = torch.empty((2 * n, self.embedding_cache_matrix.shape[1]), device=self.device, dtype=self._embedding_dtype)
+            grown[:n] = self.embedding_cache_matrix[:n]
+            self.embedding_cache_matrix = grown
+        self.embedding_cache_matrix[n] = embedding[0]
+        self.embedding_cache_index[query] = n
+        self._append_embedding(query, embedding)
+        return self.embedding_cache_matrix[n:n + 1]
+
+    def _append_embedding(self, query: str, embedding: torch.Tensor):
+        """Append one embedding row and its key to disk (O(D) bytes per miss)"""
         try:
-            # Convert tensors to lists for JSON serialization
-            data = {k: v.cpu().numpy().tolist() for k, v in self.embedding_cache.items()}
-            with open(self.embedding_cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f)
+            row = embedding.detach().reshape(-1).cpu().to(torch.float16).numpy()
+            with open(self.embedding_cache_file, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(_EMBEDDING_HEADER.pack(_EMBEDDING_MAGIC, row.shape[0]))
+                f.write(row.tobytes())
+            with open(self.embedding_keys_file, 'a', encoding='utf-8') as f:
+                # JSON-encode so queries containing newlines stay on one line
+                f.write(json.dumps(query, ensure_ascii=False) + "\n")
         except Exception as e:
             self.logger.warning(f"Failed to save persistent embedding cache: {e}")
 
@@ -152,6 +527,34 @@ class VectorSearchService:
         """Initialize ML models (CLIP)"""
         self.logger.info("Initializing ML models...")
 
+        model_config = self.config.model
+        key = (
+            model_config.clip_model_name, model_config.clip_checkpoint_path or model_config.clip_pretrained,
+            str(self.device), model_config.int8_quantize
+        )
+        with _clip_lock:
+            shared = _clip_models.get(key)
+            if shared is None:
+                shared = _clip_models[key] = self._load_clip()
+            else:
+                self.logger.info("Reusing CLIP model already loaded in this process")
+        self.clip_model, self.clip_preprocess, self.clip_tokenizer = shared
+
+        # Rerank staging buffers are sized from the model's preprocessing output
+        self._rerank_input_shape = tuple(self.clip_preprocess(Image.new('RGB', (32, 32))).shape)
+        self._rerank_staging_pool = []
+        self._copy_stream = torch.cuda.Stream() if 'cuda' in str(self.device) else None
+
+        # Precompute common query tokens for performance
+        self.precomputed_tokens = {
+            query: self.clip_tokenizer([query]).to(self.device)
+            for query in self.common_queries
+        }
+
+        self.logger.info("Models initialized successfully")
+
+    def _load_clip(self) -> Tuple[Any, Any, Any]:
+        """Load, cast and compile CLIP; returns (model, preprocess, tokenizer)"""
         checkpoint_path = self.config.model.clip_checkpoint_path
         
         # Check for local checkpoint first (avoids network calls to HuggingFace)
@@ -185,39 +588,104 @@ class VectorSearchService:
         if 'cuda' in str(self.device):
             self.logger.info("Casting CLIP model to FP16 (Half Precision)")
             self.clip_model.half()
-            
-        self.clip_tokenizer = open_clip.get_tokenizer(self.config.model.clip_model_name)
 
-        # Precompute common query tokens for performance
-        self.precomputed_tokens = {
-            query: self.clip_tokenizer([query]).to(self.device)
-            for query in self.common_queries
-        }
+        if self.config.model.int8_quantize:
+            self._quantize_int8()
 
-        self.logger.info("Models initialized successfully")
+        if 'cuda' in str(self.device) and hasattr(torch, 'compile') and sys.platform != 'win32':
+            # Inductor fuses the ViT layernorm/matmul/activation chains; shapes are fixed
+            # (padded rerank batches, tokenizer pads to context length) so graphs are reused
+            self.logger.info("Compiling CLIP encoders with torch.compile")
+            self.clip_model.encode_image = torch.compile(self.clip_model.encode_image, mode="reduce-overhead", dynamic=False, fullgraph=False)
+            self.clip_model.encode_text = torch.compile(self.clip_model.encode_text, mode="reduce-overhead", dynamic=False, fullgraph=False)
+
+        tokenizer = self._build_fast_tokenizer(open_clip.get_tokenizer(self.config.model.clip_model_name))
+        return self.clip_model, self.clip_preprocess, tokenizer
+
+    def _build_fast_tokenizer(self, tokenizer):
+        """Swap open_clip's pure-Python BPE for the Rust CLIPTokenizerFast when it is equivalent
+
+        Only OpenAI-vocab models (SimpleTokenizer) are swapped; HF-tokenizer models already
+        use a fast tokenizer. Padding positions are zeroed to match open_clip's output. The
+        tokenizer is loaded from the local HF cache only and kept only if its ids match
+        open_clip's on probe strings.
+        """
+        is_simple = tokenizer is getattr(open_clip, 'tokenize', None) or type(tokenizer).__name__ == 'SimpleTokenizer'
+        if not (FAST_TOKENIZER_AVAILABLE and is_simple):
+            return tokenizer
+        try:
+            # Cached files only: never wait on the hub at startup (offline machines fall back below)
+            fast = CLIPTokenizerFast.from_pretrained("openai/clip-vit-base-patch32", local_files_only=True)
+        except Exception as e:
+            self.logger.warning(f"Fast CLIP tokenizer unavailable, using open_clip tokenizer: {e}")
+            return tokenizer
+        context_length = getattr(tokenizer, 'context_length', 77)
+
+        def tokenize(texts):
+            if isinstance(texts, str): texts = [texts]
+            enc = fast(list(texts), padding='max_length', truncation=True, max_length=context_length, return_tensors='pt')
+            return enc.input_ids * enc.attention_mask
+
+        # open_clip cleans text (ftfy, html unescape, whitespace) before BPE and the HF tokenizer
+        # does not; only swap when both produce identical ids on representative inputs
+        try:
+            probes = list(_TOKENIZER_PROBES) + list(self.common_queries)
+            if not torch.equal(tokenizer(probes).long(), tokenize(probes).long()):
+                self.logger.warning("CLIPTokenizerFast output differs from open_clip's; keeping open_clip tokenizer")
+                return tokenizer
+        except Exception as e:
+            self.logger.warning(f"Could not compare CLIP tokenizers, using open_clip tokenizer: {e}")
+            return tokenizer
+
+        self.logger.info("Using CLIPTokenizerFast for text tokenization")
+        return tokenize
+
+    def _quantize_int8(self):
+        """Swap the transformer Linear layers of the CLIP model for INT8 versions"""
+        if 'cuda' in str(self.device):
+            if not BNB_AVAILABLE:
+                self.logger.warning("int8_quantize requested but bitsandbytes is not installed; keeping FP16")
+                return
+            towers = [getattr(self.clip_model, 'transformer', None), getattr(getattr(self.clip_model, 'visual', None), 'transformer', None)]
+            swapped = 0
+            for tower in towers:
+                if tower is None: continue
+                for parent in list(tower.modules()):
+                    for name, child in list(parent.named_children()):
+                        # MultiheadAttention reads out_proj.weight directly, so only MLP Linears are swapped
+                        if type(child) is not torch.nn.Linear: continue
+                        qlinear = bnb.nn.Linear8bitLt(
+                            child.in_features, child.out_features, bias=child.bias is not None,
+                            has_fp16_weights=False, threshold=6.0
+                        )
+                        qlinear.weight = bnb.nn.Int8Params(child.weight.data.cpu(), requires_grad=False, has_fp16_weights=False)
+                        if child.bias is not None:
+                            qlinear.bias = torch.nn.Parameter(child.bias.data, requires_grad=False)
+                        setattr(parent, name, qlinear.to(self.device))  # moving to CUDA quantizes the weights
+                        swapped += 1
+            self.logger.info(f"Quantized {swapped} CLIP Linear layers to INT8 (bitsandbytes)")
+        else:
+            self.clip_model = torch.ao.quantization.quantize_dynamic(self.clip_model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.logger.info("Applied dynamic INT8 quantization to CLIP Linear layers (CPU)")
 
     def _initialize_database(self):
         """Initialize Milvus database connection"""
         self.logger.info("Initializing database connection...")
 
-        # Create Milvus client
-        self.milvus_client = MilvusClient(
-            uri=f"http://{self.config.database.host}:{self.config.database.port}",
-            db=self.config.database.database
-        )
+        # Milvus client and loaded collection are shared across service instances in the process
+        uri = f"http://{self.config.database.host}:{self.config.database.port}"
+        self.milvus_client = get_milvus_client(uri, self.config.database.database)
 
-        # Load collection
+        # Load collection (skipped when it is already loaded server-side)
         try:
-            self.milvus_client.load_collection(
-                collection_name=self.config.database.collection_name,
-                replica_number=self.config.database.replica_number
-            )
+            if not ensure_collection_loaded(
+                self.milvus_client, uri, self.config.database.database,
+                self.config.database.collection_name, self.config.database.replica_number
+            ):
+                self.logger.info(f"Collection {self.config.database.collection_name} already loaded")
 
-            # Check load state
-            load_state = self.milvus_client.get_load_state(
-                collection_name=self.config.database.collection_name
-            )
-            self.logger.info(f"Collection {self.config.database.collection_name} load state: {load_state}")
+            self._check_vector_index()
+            self._detect_vector_dtype()
 
         except Exception as e:
             self.logger.error(f"Failed to load collection: {e}")
@@ -225,118 +693,198 @@ class VectorSearchService:
 
         self.logger.info("Database connection initialized successfully")
 
-    @lru_cache(maxsize=1000)
+    def _detect_vector_dtype(self):
+        """Send query vectors as float16 when the collection stores FLOAT16_VECTOR (half the bytes on the wire)"""
+        self._vector_dtype = np.float32
+        try:
+            schema = self.milvus_client.describe_collection(self.config.database.collection_name)
+            for field in schema.get("fields", []):
+                if field.get("name") == "vector" and field.get("type") == DataType.FLOAT16_VECTOR:
+                    self._vector_dtype = np.float16
+        except Exception as e:
+            self.logger.warning(f"Could not describe collection schema: {e}")
+        self.logger.info(f"Query vector dtype: {np.dtype(self._vector_dtype).name}")
+
+    def _check_vector_index(self):
+        """Record the vector index type (it decides ef vs nprobe) and warn on unquantized IVF"""
+        collection_name = self.config.database.collection_name
+        self._index_type = "HNSW"
+        try:
+            for index_name in self.milvus_client.list_indexes(collection_name, field_name="vector"):
+                self._index_type = self.milvus_client.describe_index(collection_name, index_name).get("index_type", "") or "HNSW"
+                if self._index_type == "IVF_FLAT":
+                    self.logger.warning(
+                        f"Collection {collection_name} still uses {self._index_type} index; "
+                        "rebuild with HNSW or IVF_SQ8 (tools/rebuild_index.py) for faster search"
+                    )
+                else:
+                    self.logger.info(f"Collection {collection_name} vector index: {self._index_type}")
+        except Exception as e:
+            self.logger.warning(f"Could not describe vector index: {e}")
+
+    def _search_params(self, limit: int) -> Dict[str, Any]:
+        if self._index_type.startswith("IVF"):
+            return {"metric_type": "COSINE", "params": {"nprobe": self.config.database.search_nprobe}}
+        # HNSW: ef must be >= limit; scale it so large rerank feeds keep recall
+        return {"metric_type": "COSINE", "params": {"ef": max(limit * 2, 100)}}
+
+    @torch.inference_mode()
     def encode_clip_text(self, query: str) -> torch.Tensor:
-        """Encode text using CLIP model with caching"""
-        # 1. Check in-memory lru_cache (handled by decorator)
-        # 2. Check persistent embedding cache
-        if query in self.embedding_cache:
-            return self.embedding_cache[query]
-
-        # 3. Check precomputed tokens (extra optimization)
-        cached_token = self.precomputed_tokens.get(query)
-        if cached_token is not None:
-            text_inputs = cached_token
-        else:
-            text_inputs = self.clip_tokenizer([query]).to(self.device)
+        """Encode text using CLIP model with caching (no autograd bookkeeping)"""
+        # 1. Lock-free fast path: persistent embedding cache
+        cached = self._get_cached_embedding(query)
+        if cached is not None:
+            return cached
+
+        with self._embedding_lock:
+            # 2. Re-check: a concurrent miss for the same query may have just filled it
+            cached = self._get_cached_embedding(query)
+            if cached is not None:
+                return cached
+
+            # 3. Check precomputed tokens (extra optimization)
+            cached_token = self.precomputed_tokens.get(query)
+            if cached_token is not None:
+                text_inputs = cached_token
+            else:
+                text_inputs = self.clip_tokenizer([query]).to(self.device)
 
-        with torch.no_grad():
             text_features = self.clip_model.encode_text(text_inputs)
             result = F.normalize(text_features, p=2, dim=-1)
-            
+
             # Save to persistent cache
-            self.embedding_cache[query] = result
-            self._save_embedding_cache()
-            
-            return result
+            return self._cache_embedding(query, result)
+
+    @torch.inference_mode()
+    def encode_clip_text_batch(self, queries: List[str]) -> torch.Tensor:
+        """Encode several queries in one CLIP forward; returns an [N, D] tensor"""
+        with self._embedding_lock:
+            misses = list(dict.fromkeys(q for q in queries if q not in self.embedding_cache_index))
+            for start in range(0, len(misses), TEXT_BATCH_BUCKETS[-1]):
+                chunk = misses[start:start + TEXT_BATCH_BUCKETS[-1]]
+                bucket = next(b for b in TEXT_BATCH_BUCKETS if b >= len(chunk))
+                # Pad by repeating the last query; the padded rows are dropped
+                text_inputs = self.clip_tokenizer(chunk + chunk[-1:] * (bucket - len(chunk))).to(self.device)
+                text_features = F.normalize(self.clip_model.encode_text(text_inputs), p=2, dim=-1)
+                for i, query in enumerate(chunk):
+                    self._cache_embedding(query, text_features[i:i + 1])
+            rows = torch.tensor([self.embedding_cache_index[q] for q in queries], device=self.device)
+            return self.embedding_cache_matrix.index_select(0, rows).float()
 
+    @torch.inference_mode()
     def encode_clip_image(self, image: Image.Image) -> torch.Tensor:
         """Encode image using CLIP model"""
         image_input = self.clip_preprocess(image).unsqueeze(0).to(self.device)
-        with torch.no_grad():
-            image_features = self.clip_model.encode_image(image_input)
-            return F.normalize(image_features, p=2, dim=-1)
+        image_features = self.clip_model.encode_image(image_input)
+        return F.normalize(image_features, p=2, dim=-1)
 
     def extract_keywords(self, text: str) -> List[str]:
         """Extract keywords from OCR query text"""
         if not text or not text.strip():
             return []
         
-        vietnamese_stopwords = {
-            'và', 'của', 'có', 'được', 'cho', 'với', 'trong', 'từ', 'đã', 'sẽ',
-            'các', 'này', 'đó', 'những', 'một', 'để', 'là', 'như', 'về', 'ở',
-            'khi', 'bị', 'vào', 'ra', 'đến', 'thì', 'hoặc', 'nhưng', 'mà',
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-            'of', 'with', 'by', 'from', 'as', 'is', 'are', 'was', 'were', 'be'
-        }
-        
-        text = re.sub(r'[^\w\sÀÁÂÃÈÉÊÌÍÒÓÔÕÙÚĂĐĨŨƠàáâãèéêìíòóôõùúăđĩũơƯĂẠẢẤẦẨẪẬẮẰẲẴẶẸẺẼỀỀỂưăạảấầẩẫậắằẳẵặẹẻẽềềểỄỆỈỊỌỎỐỒỔỖỘỚỜỞỠỢỤỦỨỪễệỉịọỏốồổỗộớờởỡợụủứừỬỮỰỲỴÝỶỸửữựỳỵýỷỹ]', ' ', text)
-        tokens = text.lower().split()
-        return [w for w in tokens if len(w) > 1 and w not in vietnamese_stopwords]
+        tokens = _KEYWORD_CLEAN_RE.sub(' ', text).lower().split()
+        return [w for w in tokens if len(w) > 1 and w not in VIETNAMESE_STOPWORDS]
     
-    def calculate_text_match_score(self, ocr_text: str, keywords: List[str]) -> float:
-        """Calculate text matching score based on keyword overlap"""
+    def prepare_keywords(self, keywords: List[str]) -> List[Tuple[str, str]]:
+        """Lowercase and accent-strip keywords once so they can be scored against many OCR texts"""
+        return [(kw.lower(), normalize_vietnamese(kw)) for kw in keywords]
+
+    def calculate_text_match_score(self, ocr_text: str, keywords: List[Any]) -> float:
+        """Calculate text matching score based on keyword overlap
+
+        keywords may be plain strings or (lower, normalized) pairs from prepare_keywords.
+        """
         if not keywords or not ocr_text:
             return 0.0
-        
-        def normalize_vietnamese(text):
-            replacements = {
-                'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a', 'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ẩ': 'a', 'ẫ': 'a', 'ậ': 'a',
-                'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ẳ': 'a', 'ẵ': 'a', 'ặ': 'a',
-                'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e', 'ê': 'e', 'ề': 'e', 'ế': 'e', 'ể': 'e', 'ễ': 'e', 'ệ': 'e',
-                'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
-                'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o', 'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ổ': 'o', 'ỗ': 'o', 'ộ': 'o',
-                'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ở': 'o', 'ỡ': 'o', 'ợ': 'o',
-                'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u', 'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ử': 'u', 'ữ': 'u', 'ự': 'u',
-                'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y', 'đ': 'd'
-            }
-            result = text.lower()
-            for viet, latin in replacements.items():
-                result = result.replace(viet, latin)
-            return result
-        
+
         ocr_lower = ocr_text.lower()
-        ocr_normalized = normalize_vietnamese(ocr_text)
-        
+        ocr_normalized = ocr_lower.translate(_VIET_TRANSLATE)
+        ocr_words = set(ocr_normalized.split())
+        ocr_long_words = [w for w in ocr_words if len(w) >= 4]
+
         match_score = 0.0
         for kw in keywords:
-            kw_lower = kw.lower()
-            kw_normalized = normalize_vietnamese(kw)
+            kw_lower, kw_normalized = kw if isinstance(kw, tuple) else (kw.lower(), normalize_vietnamese(kw))
             if kw_lower in ocr_lower: match_score += 1.0
             elif kw_normalized in ocr_normalized: match_score += 0.9
-            elif any(kw_normalized in word or word in kw_normalized for word in ocr_normalized.split()): match_score += 0.7
-            elif len(kw_normalized) >= 4 and any(kw_normalized in word or word in kw_normalized for word in ocr_normalized.split() if len(word) >= 4): match_score += 0.5
-        
+            elif any(kw_normalized in word or word in kw_normalized for word in ocr_words): match_score += 0.7
+            elif len(kw_normalized) >= 4 and any(kw_normalized in word or word in kw_normalized for word in ocr_long_words): match_score += 0.5
+
         return min(match_score / len(keywords), 1.0)
 
-    @log_execution_time
-    async def query_milvus(self, query_vector: torch.Tensor, milvus_filter=None, limit: int = None, include_ocr: bool = True) -> List[Any]:
+    def _extra_output_fields(self) -> List[str]:
+        """Payload-heavy OCR/RAM fields, only needed on results that reach the frontend"""
+        fields = []
+        if self.config.use_ocr_search: fields.extend(['ocr_text', 'has_text'])
+        if self.config.use_ram_tags: fields.extend(['ram_tags', 'has_ram_tags'])
+        return fields
+
+    async def _hydrate_extra_fields(self, results: List[Any]) -> List[Any]:
+        """Fetch OCR/RAM fields for the final results of a search run with include_ocr=False"""
+        extra_fields = self._extra_output_fields()
+        ids = [hit.get('id') for hit in results]
+        if not extra_fields or not ids: return results
+        loop = asyncio.get_running_loop()
+        try:
+            rows = await loop.run_in_executor(self.milvus_executor, partial(
+                self.milvus_client.get,
+                collection_name=self.config.database.collection_name,
+                ids=ids,
+                output_fields=extra_fields
+            ))
+        except Exception as e:
+            self.logger.warning(f"Failed to fetch OCR/RAM fields for results: {e}")
+            return results
+        by_id = {row.get('id', row.get('frame_id')): row for row in rows}
+        for hit in results:
+            row = by_id.get(hit.get('id'))
+            if row is None: continue
+            entity = hit.get('entity')
+            if entity is not None:
+                entity.update({f: row[f] for f in extra_fields if f in row})
+        return results
+
+    async def query_milvus(self, query_vector: torch.Tensor, milvus_filter=None, limit: int = None, include_ocr: bool = True, output_fields: Optional[List[str]] = None) -> List[Any]:
         """Query Milvus vector database"""
+        results = await self.query_milvus_batch(query_vector, milvus_filter=milvus_filter, limit=limit, include_ocr=include_ocr, output_fields=output_fields)
+        return results[0] if results else []
+
+    @log_execution_time
+    async def query_milvus_batch(self, query_vectors, milvus_filter=None, limit: int = None, include_ocr: bool = True, output_fields: Optional[List[str]] = None) -> List[List[Any]]:
+        """Query Milvus with a (D,) or (B, D) tensor/array in one request; returns one hit list per row"""
         if limit is None: limit = self.config.database.search_limit
-        output_fields = ['keyframe_path', 'frame_id', 'video']
-        if include_ocr and self.config.use_ocr_search: output_fields.extend(['ocr_text', 'has_text'])
-        if include_ocr and self.config.use_ram_tags: output_fields.extend(['ram_tags', 'has_ram_tags'])
+        if isinstance(query_vectors, torch.Tensor):
+            query_vectors = query_vectors.detach().float().cpu().numpy()
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=self._vector_dtype))
+        # FLOAT16_VECTOR fields take ndarray rows; FLOAT_VECTOR fields take plain float lists
+        data = list(query_vectors) if self._vector_dtype is np.float16 else query_vectors.tolist()
+        # Callers that only score hits pass SCORING_FIELDS; everything else gets the display fields
+        if output_fields is None:
+            output_fields = ['keyframe_path', 'frame_id', 'video']
+            if include_ocr: output_fields.extend(self._extra_output_fields())
 
-        results = await asyncio.to_thread(
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self.milvus_executor, partial(
             self.milvus_client.search,
             collection_name=self.config.database.collection_name,
             anns_field="vector",
-            data=[query_vector.tolist()[0]],
+            data=data,
             limit=limit,
             output_fields=output_fields,
-            search_params={"metric_type": "COSINE", "params": {"nprobe": 64}},
+            search_params=self._search_params(limit),
             filter=milvus_filter
-        )
-        
+        ))
+
         if not results: return []
-        processed_results = []
-        for hit in results[0]:
-            entity = hit.entity if hasattr(hit, 'entity') else hit
-            if 'keyframe_path' in entity: entity['path'] = entity['keyframe_path']
-            # REMOVED: Premature 25fps time calculation. 
-            # Time is now accurately calculated in _format_single_result using per-batch FPS.
-            processed_results.append(hit)
-        return processed_results
+        # Hits are returned untouched; the legacy 'path' alias and the per-batch-FPS time
+        # are filled in by _format_single_result for the results that reach the frontend
+        return [list(hits) for hits in results]
+
+    async def _encode_and_search(self, query: str, milvus_filter=None, limit: int = None, include_ocr: bool = True, output_fields: Optional[List[str]] = None) -> List[Any]:
+        """Encode one query on the CLIP worker, then search Milvus with it"""
+        query_vector = await asyncio.get_running_loop().run_in_executor(self.clip_executor, self.encode_clip_text, query)
+        return await self.query_milvus(query_vector, milvus_filter=milvus_filter, limit=limit, include_ocr=include_ocr, output_fields=output_fields)
 
     async def process_temporal_query(self, first_query: str, second_query: str = "", top_k: int = None) -> List[Any]:
         """Process temporal query with two text queries using SAT translation"""
@@ -361,18 +909,23 @@ class VectorSearchService:
 
         try:
             t_enc_start = time.time()
+            # With reranking on, most candidates are discarded: skip OCR/RAM payloads on the
+            # feeder search and fetch them afterwards for the surviving results only
+            feeder_include_ocr = not self.enable_clip_reranking
             if second_query_en and second_query_en.strip():
-                first_encoded, second_encoded = await asyncio.gather(
-                    asyncio.to_thread(self.encode_clip_text, first_query_en),
-                    asyncio.to_thread(self.encode_clip_text, second_query_en)
+                # Each query's search starts as soon as its own encoding is done, so the
+                # second CLIP forward overlaps the first Milvus round-trip
+                fkq, nkq = await asyncio.gather(
+                    self._encode_and_search(first_query_en, include_ocr=feeder_include_ocr),
+                    # Second-query hits only feed temporal scoring, never the response
+                    self._encode_and_search(second_query_en, output_fields=SCORING_FIELDS)
                 )
-                self.logger.info(f"CLIP Encoding (Temporal) took {time.time() - t_enc_start:.4f}s")
-                fkq, nkq = await asyncio.gather(self.query_milvus(first_encoded), self.query_milvus(second_encoded))
+                self.logger.info(f"CLIP Encoding + Milvus search (Temporal) took {time.time() - t_enc_start:.4f}s")
                 result = self._process_temporal_relationships(fkq, nkq)
             else:
-                first_encoded = await asyncio.to_thread(self.encode_clip_text, first_query_en)
+                first_encoded = await asyncio.get_running_loop().run_in_executor(self.clip_executor, self.encode_clip_text, first_query_en)
                 self.logger.info(f"CLIP Encoding took {time.time() - t_enc_start:.4f}s")
-                fkq = await self.query_milvus(first_encoded)
+                fkq = await self.query_milvus(first_encoded, include_ocr=feeder_include_ocr)
                 initial_slice = max(top_k or 1000, 1000)
                 result = list(fkq[:initial_slice])
 
@@ -392,6 +945,9 @@ class VectorSearchService:
             if self.enable_clip_reranking and len(result) > 0:
                 result = await self._clip_rerank(first_query_en, result, top_k=top_k or 100)
             self.logger.info(f"CLIP reranking took {time.time() - t_rerank_start:.4f}s")
+
+            if not feeder_include_ocr and result:
+                result = await self._hydrate_extra_fields(result)
             
             formatted_results = self._format_results_for_frontend_lite(result)
             
@@ -414,9 +970,21 @@ class VectorSearchService:
             self.logger.info(f"Temporal query finished in {time.time() - start_time:.4f}s")
 
     def _get_cache_key(self, first_query: str, second_query: str = "", top_k: int = None) -> str:
-        query_str = f"{first_query}|{second_query}|{top_k}"
-        return hashlib.md5(query_str.encode()).hexdigest()
+        return self._hash_key(first_query, second_query, top_k)
+
+    @staticmethod
+    def _hash_key(*parts) -> str:
+        """32-hex-char cache key; blake2b is faster than md5 and no key string is concatenated"""
+        hasher = hashlib.blake2b(digest_size=16)
+        for i, part in enumerate(parts):
+            if i: hasher.update(b"|")
+            hasher.update(str(part).encode())
+        return hasher.hexdigest()
     
+    def _query_cache_file(self, cache_key: str) -> Path:
+        # Shard by the first two hex chars (256 subdirectories) to keep directories small
+        return self.query_cache_dir / cache_key[:2] / f"{cache_key}.json"
+
     def _get_cached_results(self, cache_key: str) -> Optional[List]:
         # 1. Check in-memory cache
         if cache_key in self.result_cache:
@@ -424,11 +992,11 @@ class VectorSearchService:
             if time.time() - timestamp < self.cache_ttl: return results
         
         # 2. Check disk-based persistent cache
-        cache_file = self.query_cache_dir / f"{cache_key}.json"
+        cache_file = self._query_cache_file(cache_key)
         if cache_file.exists():
             try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(cache_file, 'rb') as f:
+                    data = orjson.loads(f.read())
                     timestamp = data.get('timestamp', 0)
                     results = data.get('results', [])
                     
@@ -453,14 +1021,16 @@ class VectorSearchService:
             for key, _ in sorted_keys[:100]: del self.result_cache[key]
         
         # 2. Update disk-based persistent cache
-        cache_file = self.query_cache_dir / f"{cache_key}.json"
+        cache_file = self._query_cache_file(cache_key)
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump({
+            cache_file.parent.mkdir(exist_ok=True)
+            # Compact output: cache files are machine-read only
+            with open(cache_file, 'wb') as f:
+                f.write(orjson.dumps({
                     'timestamp': timestamp,
                     'query_info': query_info or {},
                     'results': results
-                }, f, ensure_ascii=False, indent=2)
+                }, option=_ORJSON_OPTS))
         except Exception as e:
             self.logger.warning(f"Failed to save cache to disk: {e}")
             
@@ -470,48 +1040,50 @@ class VectorSearchService:
 
     def _log_history(self, query_info: Dict):
         try:
-            history = []
-            if self.history_file.exists():
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-            
-            # Add to history (limit to last 1000 items)
+            # Append-only JSONL: O(1) per query instead of rewriting the whole history
             query_info['timestamp'] = time.time()
-            history.insert(0, query_info)
-            history = history[:1000]
-            
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
+            with open(self.history_file, 'ab') as f:
+                f.write(orjson.dumps(query_info, option=_ORJSON_OPTS) + b"\n")
+            self._history_appends += 1
+            if self._history_appends >= HISTORY_MAX_ENTRIES:
+                self._compact_history()
         except Exception as e:
             self.logger.warning(f"Failed to log history: {e}")
+
+    def _compact_history(self):
+        """Trim history.jsonl to the newest HISTORY_MAX_ENTRIES lines (atomic rewrite)"""
+        self._history_appends = 0
+        try:
+            legacy_file = self.history_file.with_suffix('.json')
+            if not self.history_file.exists() and legacy_file.exists():
+                # One-time migration: history.json stored newest-first
+                with open(legacy_file, 'rb') as f:
+                    lines = [orjson.dumps(entry) + b"\n" for entry in reversed(orjson.loads(f.read()))]
+            elif self.history_file.exists():
+                with open(self.history_file, 'rb') as f:
+                    lines = deque(f, maxlen=HISTORY_MAX_ENTRIES + 1)
+                if len(lines) <= HISTORY_MAX_ENTRIES:
+                    return
+            else:
+                return
+            tmp_file = self.history_file.with_suffix('.jsonl.tmp')
+            with open(tmp_file, 'wb') as f:
+                f.writelines(list(lines)[-HISTORY_MAX_ENTRIES:])
+            os.replace(tmp_file, self.history_file)
+        except Exception as e:
+            self.logger.warning(f"Failed to compact history: {e}")
     
     def _enforce_diversity(self, results: List[Any], min_gap_frames: int = 50, max_per_video: int = 5, max_results: int = 50) -> List[Any]:
-        selected = []
-        video_counts = defaultdict(int)
-        last_frames = {}
-        for result in results:
-            entity = result.get('entity', {})
-            video = entity.get('video', '')
-            frame_id = entity.get('frame_id', 0)
-            if video_counts[video] >= max_per_video: continue
-            if video in last_frames and abs(frame_id - last_frames[video]) < min_gap_frames: continue
-            selected.append(result)
-            video_counts[video] += 1
-            last_frames[video] = frame_id
-            if len(selected) >= max_results: break
-        
-        if len(selected) < max_results:
-            for result in results:
-                if result in selected: continue
-                video = result.get('entity', {}).get('video', '')
-                if video_counts[video] < max_per_video + 5:
-                    selected.append(result); video_counts[video] += 1
-                    if len(selected) >= max_results: break
-        return selected
+        if not results: return []
+        entities = [result.get('entity', {}) for result in results]
+        _, video_ids = np.unique(np.array([e.get('video', '') for e in entities], dtype=object), return_inverse=True)
+        frames = np.fromiter((e.get('frame_id', 0) for e in entities), dtype=np.int64, count=len(entities))
+        keep = _diversity_select(video_ids.astype(np.int64), frames, int(video_ids.max()) + 1, min_gap_frames, max_per_video, max_results)
+        return [results[i] for i in keep]
     
     async def _clip_rerank(self, query: str, candidates: List[Any], top_k: int = 100) -> List[Any]:
         if not candidates: return candidates
-        query_embedding = self.encode_clip_text(query)
+        query_embedding = await asyncio.get_running_loop().run_in_executor(self.clip_executor, self.encode_clip_text, query)
         
         # Use config depth or default
         rerank_depth = getattr(self.config, 'rerank_top_k', top_k * 3)
@@ -524,89 +1096,124 @@ class VectorSearchService:
         self.logger.info(f"Starting rerank of {len(to_rerank)} candidates (max depth: {rerank_depth})")
         
         # Pre-collect valid paths to avoid inner loop overhead
-        batch_images = []
-        batch_candidates = []
-        
-        # PERFORMANCE: Optimal batch size for 4GB VRAM
-        OPTIMAL_BATCH_SIZE = 8 
-        
-        for i, candidate in enumerate(to_rerank):
+        valid_candidates = []
+        valid_paths = []
+        for candidate in to_rerank:
             keyframe_path = candidate.get('entity', {}).get('keyframe_path', '')
             if not keyframe_path: continue
             
             # PERFORMANCE: Skip thumbnails check (deleted for space)
             # Directly use keyframes for CLIP reranking
             full_path = self.keyframes_base / keyframe_path
-            
             if full_path.exists():
-                batch_candidates.append(candidate)
-                batch_images.append(str(full_path))
-                
-                # Process in optimal batches
-                if len(batch_images) >= OPTIMAL_BATCH_SIZE:
-                    scores = await self._compute_clip_scores_batch(query_embedding, batch_images)
-                    for cand, score in zip(batch_candidates, scores):
-                        cand['distance'] = float(score)
-                        reranked.append(cand)
-                    batch_images = []
-                    batch_candidates = []
-                    
-        if batch_images:
-            scores = await self._compute_clip_scores_batch(query_embedding, batch_images)
-            for cand, score in zip(batch_candidates, scores):
-                cand['distance'] = float(score)
-                reranked.append(cand)
+                valid_candidates.append(candidate)
+                valid_paths.append(str(full_path))
+
+        batches = [range(i, min(i + RERANK_BATCH_SIZE, len(valid_paths))) for i in range(0, len(valid_paths), RERANK_BATCH_SIZE)]
+        if not batches: return reranked
+
+        # Pipeline: while batch i is scored on the GPU, batch i+1 is decoded into the other pinned buffer
+        loop = asyncio.get_running_loop()
+        staging = self._acquire_rerank_staging()
+        try:
+            pending = loop.run_in_executor(self.thread_pool, self._fill_rerank_staging, [valid_paths[j] for j in batches[0]], staging, 0)
+            for i, batch in enumerate(batches):
+                count = await pending
+                if i + 1 < len(batches):
+                    pending = loop.run_in_executor(self.thread_pool, self._fill_rerank_staging, [valid_paths[j] for j in batches[i + 1]], staging, (i + 1) % 2)
+                scores = await loop.run_in_executor(self.clip_executor, self._score_staged_batch, query_embedding, staging, i % 2, count)
+                for j, score in zip(batch, scores):
+                    valid_candidates[j]['distance'] = float(score)
+                    reranked.append(valid_candidates[j])
+        finally:
+            self._rerank_staging_pool.append(staging)
                 
         reranked.sort(key=lambda x: x.get('distance', 0), reverse=True)
         return reranked[:top_k]
 
-    async def _compute_clip_scores_batch(self, query_embedding: torch.Tensor, image_paths: List[str]) -> List[float]:
+    def _acquire_rerank_staging(self) -> Dict[str, Any]:
+        """Take a pair of (pinned, on CUDA) staging buffers; one pair per in-flight rerank"""
+        try:
+            return self._rerank_staging_pool.pop()
+        except IndexError:
+            is_cuda = 'cuda' in str(self.device)
+            shape = (RERANK_BATCH_SIZE, *self._rerank_input_shape)
+            return {
+                'buffers': [torch.empty(shape, dtype=torch.float16, pin_memory=is_cuda) for _ in range(2)],
+                'copied': [None, None],  # CUDA events marking when each buffer's H2D copy finished
+            }
+
+    def _fill_rerank_staging(self, paths: List[str], staging: Dict[str, Any], slot: int) -> int:
+        """Decode a batch of keyframes into a staging buffer (runs in the thread pool)"""
+        copied = staging['copied'][slot]
+        if copied is not None:
+            copied.synchronize()  # previous upload from this buffer must finish before overwriting it
+        buf = staging['buffers'][slot]
+        for row, path in enumerate(paths):
+            try:
+                buf[row].copy_(self._load_preprocessed(path))
+            except Exception as e:
+                self.logger.warning(f"Error loading {path}: {e}")
+                buf[row].zero_()
+        buf[len(paths):].zero_()
+        return len(paths)
+
+    def _score_staged_batch(self, query_embedding: torch.Tensor, staging: Dict[str, Any], slot: int, count: int) -> List[float]:
+        """Upload a filled staging buffer and score it against the query (runs on the CLIP executor)"""
         try:
             t_start = time.time()
-            # OPTIMIZATION: Reuse the persistent thread pool for parallel disk I/O
-            loop = asyncio.get_event_loop()
-            
-            def load_and_preprocess_batch(paths):
-                results = []
-                for path in paths:
-                    try:
-                        # Convert to RGB explicitly and preprocess
-                        img = Image.open(path).convert('RGB')
-                        results.append(self.clip_preprocess(img))
-                    except Exception as e:
-                        print(f"Error loading {path}: {e}")
-                        results.append(torch.zeros(3, 224, 224))
-                return results
-
-            # Run batch loading in existing thread pool
-            images = await loop.run_in_executor(self.thread_pool, load_and_preprocess_batch, image_paths)
-            t_load = time.time() - t_start
-
-            if not images: return [0.0] * len(image_paths)
-            
-            t_inference_start = time.time()
-            image_batch = torch.stack(images).to(self.device).half()
-            
-            # Ensure GPU completes previous work for accurate timing
-            if 'cuda' in str(self.device): torch.cuda.synchronize()
-            t_after_stack = time.time()
-            
+            is_cuda = 'cuda' in str(self.device)
+            buf = staging['buffers'][slot]
+            if is_cuda:
+                # Copy on a side stream; compute waits on the event rather than a full synchronize
+                with torch.cuda.stream(self._copy_stream):
+                    image_batch = buf.to(self.device, non_blocking=True)
+                    copied = torch.cuda.Event()
+                    copied.record()
+                staging['copied'][slot] = copied
+                torch.cuda.current_stream().wait_event(copied)
+                image_batch.record_stream(torch.cuda.current_stream())
+            else:
+                image_batch = buf.clone()
+
             # OPTIMIZATION: Use NEW Mixed Precision (FP16) syntax
-            with torch.no_grad(), torch.amp.autocast(device_type='cuda' if 'cuda' in str(self.device) else 'cpu'):
+            with torch.no_grad(), torch.amp.autocast(device_type='cuda' if is_cuda else 'cpu'):
                 image_features = self.clip_model.encode_image(image_batch)
                 image_features = F.normalize(image_features, p=2, dim=-1)
-                similarities = (query_embedding @ image_features.T).squeeze(0)
-            
-            if 'cuda' in str(self.device): torch.cuda.synchronize()
-            t_inference = time.time() - t_after_stack
-            
+                similarities = (query_embedding @ image_features.T).squeeze(0)[:count]
+            scores = similarities.cpu().tolist()
+
             # INSTRUMENTATION: Change to DEBUG to reduce console noise (only summary is usually needed)
-            self.logger.debug(f"Batch of {len(image_paths)}: Load={t_load:.3f}s, Stack={t_after_stack - t_inference_start:.3f}s, Inference={t_inference:.3f}s")
-            
-            return similarities.cpu().tolist()
+            self.logger.debug(f"Batch of {count}: Upload+Inference={time.time() - t_start:.3f}s")
+            return scores
         except Exception as e:
             self.logger.error(f"Batch score error: {e}")
-            return [0.0] * len(image_paths)
+            return [0.0] * count
+
+    def _load_preprocessed(self, path: str) -> torch.Tensor:
+        """Return the CLIP-preprocessed tensor for a keyframe, using the on-disk FP16 cache"""
+        st = os.stat(path)
+        key = f"{self.config.model.clip_model_name}|draft|{os.path.abspath(path)}|{st.st_mtime_ns}"
+        cache_file = self.preproc_cache_dir / f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}.f16.bin"
+        if cache_file.exists():
+            flat = np.fromfile(cache_file, dtype=np.float16)
+            side = int(round((flat.size // 3) ** 0.5))
+            return torch.from_numpy(flat.reshape(3, side, side))
+
+        # draft() lets libjpeg IDCT at 1/2..1/8 scale (still >= the crop size); no-op for non-JPEG
+        img = Image.open(path)
+        img.draft('RGB', self._rerank_input_shape[1:])
+        img = img.convert('RGB')
+        tensor = self.clip_preprocess(img)
+        # The batch is cast to half before inference, so FP16 storage is lossless here
+        half = tensor.to(torch.float16)
+        try:
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{threading.get_ident()}.tmp")
+            half.numpy().tofile(tmp_file)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            self.logger.debug(f"Could not cache preprocessed {path}: {e}")
+        return half
 
     async def process_sequential_queries(self, queries: List[str], top_k: int = 50, require_all_steps: bool = False, time_gap_constraints: Optional[List[Dict[str, int]]] = None) -> Dict[str, Any]:
         """Process sequential queries with SAT translation"""
@@ -615,25 +1222,28 @@ class VectorSearchService:
         translated_queries = [self.translator.process_query(q) for q in queries]
         self.logger.info(f"Sequential SAT: {queries} -> {translated_queries}")
         
-        cache_key = hashlib.md5(f"{'|'.join(translated_queries)}|{top_k}".encode()).hexdigest()
+        cache_key = self._hash_key(*translated_queries, top_k)
         cached = self._get_cached_results(cache_key)
         if cached is not None: return cached
         
         try:
-            encoded_queries = await asyncio.gather(*[asyncio.to_thread(self.encode_clip_text, q) for q in translated_queries])
+            # One CLIP forward and one multi-vector Milvus search for all steps
+            encoded_queries = await asyncio.get_running_loop().run_in_executor(self.clip_executor, self.encode_clip_text_batch, translated_queries)
             search_limit = getattr(self.config, 'sequential_search_limit_per_step', 1000)
-            step_results = await asyncio.gather(*[self.query_milvus(enc, limit=search_limit) for enc in encoded_queries])
-            paths = self._build_sequential_paths(step_results, translated_queries, time_gap_constraints)
-            scored_paths = self._score_sequential_paths(paths, len(queries), require_all_steps)
-            final_results = scored_paths[:top_k]
+            step_results = await self.query_milvus_batch(encoded_queries, limit=search_limit)
+            all_hits, hit_indices, distances, steps_flat, offsets = self._build_sequential_paths(step_results, time_gap_constraints)
+            top, scores = self._score_sequential_paths(distances, steps_flat, offsets, len(queries), require_all_steps, top_k)
             
+            # Hits are only touched for the paths that survive scoring
             formatted_results = []
-            for path_data in final_results:
-                hit = path_data['result']
-                hit_dict = {'id': getattr(hit, 'id', None), 'distance': getattr(hit, 'distance', 0.0), 'entity': dict(hit.entity) if hasattr(hit, 'entity') else {}}
-                if 'entity' in hit_dict['entity'] and isinstance(hit_dict['entity']['entity'], dict): hit_dict['entity'].update(hit_dict['entity']['entity'])
-                hit_dict.update({'matched_steps': path_data['matched_steps'], 'completeness': path_data['completeness'], 'sequential_score': path_data['score']})
-                if 'path' in hit_dict['entity'] and 'keyframe_path' not in hit_dict['entity']: hit_dict['entity']['keyframe_path'] = hit_dict['entity']['path']
+            for i in top.tolist():
+                id_val, dist_val, entity = self._unpack_hit(all_hits[hit_indices[i]])
+                _flatten_entity(entity)
+                matched_steps = steps_flat[offsets[i]:offsets[i + 1]].tolist()
+                hit_dict = {
+                    'id': id_val, 'distance': dist_val, 'entity': entity,
+                    'matched_steps': matched_steps, 'completeness': len(matched_steps) / len(queries), 'sequential_score': float(scores[i])
+                }
                 formatted_results.append(self._format_single_result(hit_dict))
             
             response = {'kq': formatted_results, 'total_results': len(formatted_results), 'num_steps': len(queries), 'queries': translated_queries, 'execution_time': time.time() - start_time}
@@ -642,89 +1252,121 @@ class VectorSearchService:
         except Exception as e:
             self.logger.error(f"Sequential error: {e}"); raise HTTPException(status_code=500, detail=str(e))
 
-    def _build_sequential_paths(self, step_results, queries, time_gap_constraints):
+    def _build_sequential_paths(self, step_results, time_gap_constraints):
+        """Walk every step-0 hit forward through the later steps of its video
+
+        Returns (all_hits, hit_indices, distances, steps_flat, offsets): path i starts at
+        all_hits[hit_indices[i]] and matched steps_flat[offsets[i]:offsets[i + 1]].
+        """
         num_steps = len(step_results)
-        video_frames = defaultdict(lambda: defaultdict(list))
-        for step_idx, results in enumerate(step_results):
-            for hit in results:
-                video = hit.entity['video']
-                frame_id = int(hit.entity['frame_id'])
-                video_frames[video][step_idx].append({'frame_id': frame_id, 'result': hit, 'score': hit.score, 'step': step_idx})
-        
-        paths = []
-        for video, steps_data in video_frames.items():
-            if 0 not in steps_data: continue
-            for first_hit in steps_data[0]:
-                matched_steps = [0]; last_frame = first_hit['frame_id']
-                for step_idx in range(1, num_steps):
-                    if step_idx not in steps_data: continue
-                    candidates = [h for h in steps_data[step_idx] if h['frame_id'] > last_frame]
-                    if not candidates: continue
-                    if time_gap_constraints and step_idx - 1 < len(time_gap_constraints):
-                        constraint = time_gap_constraints[step_idx - 1]
-                        min_gap, max_gap = constraint.get('min', 0)*25, constraint.get('max', 1500)*25
-                        candidates = [h for h in candidates if min_gap <= (h['frame_id']-last_frame) <= max_gap]
-                    if candidates:
-                        best = max(candidates, key=lambda x: x['score'])
-                        matched_steps.append(step_idx); last_frame = best['frame_id']
-                paths.append({'result': first_hit['result'], 'video': video, 'matched_steps': matched_steps, 'num_matched': len(matched_steps), 'completeness': len(matched_steps)/num_steps})
-        return paths
-
-    def _score_sequential_paths(self, paths, num_steps, require_all_steps):
-        scored = []
-        for path in paths:
-            if require_all_steps and path['num_matched'] < num_steps: continue
-            similarity = 1.0 - path['result'].distance
-            consecutive_bonus = 0.0
-            if path['num_matched'] > 1:
-                steps = path['matched_steps']
-                consecutive_count = sum(1 for i in range(len(steps)-1) if steps[i+1] == steps[i]+1)
-                consecutive_bonus = consecutive_count / (num_steps - 1)
-            score = (path['completeness'] * 0.5) + (similarity * 0.4) + (consecutive_bonus * 0.1)
-            path.update({'score': score, 'similarity': similarity, 'coherence': consecutive_bonus})
-            scored.append(path)
-        scored.sort(key=lambda x: x['score'], reverse=True)
-        return scored
+        all_hits = [hit for results in step_results for hit in results]
+        n = len(all_hits)
+        if n == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return all_hits, empty, np.empty(0, dtype=np.float64), empty, np.zeros(1, dtype=np.int64)
+
+        # Columnar view of every hit: (video id, step, frame_id, score, distance), read from each entity once
+        video_ids: Dict[str, int] = {}
+        intern = video_ids.setdefault
+        rows = [(ent['video'], int(ent['frame_id']), hit.score, hit.distance) for hit in all_hits for ent in (hit.entity,)]
+        videos = np.fromiter((intern(row[0], len(video_ids)) for row in rows), dtype=np.int64, count=n)
+        steps = np.repeat(np.arange(num_steps, dtype=np.int64), [len(r) for r in step_results])
+        frames = np.fromiter((row[1] for row in rows), dtype=np.int64, count=n)
+        scores = np.fromiter((row[2] for row in rows), dtype=np.float64, count=n)
+        hit_distances = np.fromiter((row[3] for row in rows), dtype=np.float64, count=n)
+
+        # Sort by (video, step, frame) so each (video, step) bucket is a contiguous, frame-sorted range
+        order = np.lexsort((frames, steps, videos))
+        frames, scores = frames[order], scores[order]
+        group_keys = videos[order] * num_steps + steps[order]
+        bucket_keys = np.arange(len(video_ids) * num_steps)
+        bucket_lo = np.searchsorted(group_keys, bucket_keys, side='left').reshape(-1, num_steps)
+        bucket_hi = np.searchsorted(group_keys, bucket_keys, side='right').reshape(-1, num_steps)
+
+        # Allowed frame offsets from the previous match for each step: next frame must be later,
+        # and within [min, max] seconds (at 25fps) when a constraint is given
+        no_limit = np.iinfo(np.int64).max // 2
+        gap_lo = [1] * num_steps
+        gap_hi = [no_limit] * num_steps
+        for step_idx in range(1, num_steps):
+            if time_gap_constraints and step_idx - 1 < len(time_gap_constraints):
+                constraint = time_gap_constraints[step_idx - 1]
+                gap_lo[step_idx] = max(1, constraint.get('min', 0) * 25)
+                gap_hi[step_idx] = constraint.get('max', 1500) * 25
+
+        # The per-seed walk is scalar work: plain lists and bisect bounds beat NumPy call overhead here
+        frames_l, scores_l = frames.tolist(), scores.tolist()
+        bucket_lo_l, bucket_hi_l = bucket_lo.tolist(), bucket_hi.tolist()
+        step_range = range(1, num_steps)
+        seeds, steps_flat, offsets = [], [], [0]
+        add_step = steps_flat.append
+        for lo_row, hi_row in zip(bucket_lo_l, bucket_hi_l):
+            for seed in range(lo_row[0], hi_row[0]):
+                seeds.append(seed)
+                add_step(0); last_frame = frames_l[seed]
+                for step_idx in step_range:
+                    lo, hi = lo_row[step_idx], hi_row[step_idx]
+                    if lo == hi: continue
+                    # Frames are sorted, so valid candidates form one contiguous window
+                    start = bisect_left(frames_l, last_frame + gap_lo[step_idx], lo, hi)
+                    end = bisect_right(frames_l, last_frame + gap_hi[step_idx], lo, hi)
+                    if start >= end: continue
+                    # Single pass over the window, first maximum wins (argmax semantics)
+                    best, best_score = start, scores_l[start]
+                    for j in range(start + 1, end):
+                        if scores_l[j] > best_score: best, best_score = j, scores_l[j]
+                    add_step(step_idx); last_frame = frames_l[best]
+                offsets.append(len(steps_flat))
+
+        hit_indices = order[np.asarray(seeds, dtype=np.int64)]
+        return all_hits, hit_indices, hit_distances[hit_indices], np.asarray(steps_flat, dtype=np.int64), np.asarray(offsets, dtype=np.int64)
+
+    def _score_sequential_paths(self, distances, steps_flat, offsets, num_steps, require_all_steps, top_k=None):
+        """Score CSR-packed paths; returns (indices of the best paths, highest first, and all path scores)"""
+        if distances.size == 0: return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        scores, _, _ = _score_paths(distances, steps_flat, offsets, num_steps, require_all_steps)
+        # Stable descending order keeps ties in path-construction order; rejected paths score -inf
+        k = np.count_nonzero(np.isfinite(scores))
+        if top_k is not None: k = min(k, top_k)
+        return _top_k_desc(scores, k), scores
 
     def _process_temporal_relationships(self, first_results: List[Any], second_results: List[Any]) -> List[Any]:
-        fkq_data = torch.tensor([[int(item.entity['frame_id']), item.score, hash(item.entity['video'])] for item in first_results], device=self.device)
-        nkq_data = torch.tensor([[int(item.entity['frame_id']), item.score, hash(item.entity['video'])] for item in second_results], device=self.device)
-        frame_diff = nkq_data[:, None, 0] - fkq_data[None, :, 0]
-        same_video_mask = fkq_data[None, :, 2] == nkq_data[:, None, 2]
-        valid_frame_diff_mask = (frame_diff > 0) & (frame_diff <= 1500) & same_video_mask
-        score_increase = nkq_data[:, None, 1] * (1500 - frame_diff) / 1500
-        score_increase = torch.where(valid_frame_diff_mask, score_increase, torch.zeros_like(score_increase))
-        fkq_data[:, 1] += score_increase.max(dim=0).values
-        scores = fkq_data[:, 1].cpu().numpy()
-        sorted_indices = np.argsort(scores)[::-1][:1000]
-        return [first_results[i] for i in sorted_indices]
+        # A few hundred hits per side: plain NumPy beats a GPU round-trip at this size
+        if not first_results: return []
+        # Dense per-query video ids (first-seen order) instead of hash(): exact and int32-compact
+        video_ids: Dict[str, int] = {}
+        intern = video_ids.setdefault
+        fk_frame = np.fromiter((int(item.entity['frame_id']) for item in first_results), dtype=np.int64, count=len(first_results))
+        fk_score = np.fromiter((item.score for item in first_results), dtype=np.float64, count=len(first_results))
+        fk_video = np.fromiter((intern(item.entity['video'], len(video_ids)) for item in first_results), dtype=np.int32, count=len(first_results))
+        if second_results:
+            nk_frame = np.fromiter((int(item.entity['frame_id']) for item in second_results), dtype=np.int64, count=len(second_results))
+            nk_score = np.fromiter((item.score for item in second_results), dtype=np.float64, count=len(second_results))
+            nk_video = np.fromiter((intern(item.entity['video'], len(video_ids)) for item in second_results), dtype=np.int32, count=len(second_results))
+            fk_score = fk_score + _temporal_boost(fk_video, fk_frame, nk_video, nk_frame, nk_score, TEMPORAL_WINDOW_FRAMES)
+        return [first_results[i] for i in _top_k_desc(fk_score, 1000)]
+
+    @staticmethod
+    def _unpack_hit(hit) -> Tuple[Any, float, Dict[str, Any]]:
+        """(id, distance, entity) for a MilvusClient dict hit or a pymilvus Hit, without copying the entity"""
+        if isinstance(hit, dict):
+            # MilvusClient return
+            return hit.get('id'), hit.get('distance', 0.0), hit.get('entity', hit)
+        # pymilvus Hit object: only materialize the entity if it is not already a mapping
+        entity = getattr(hit, 'entity', None)
+        if entity is None: entity = {}
+        elif not isinstance(entity, dict): entity = dict(entity)
+        return getattr(hit, 'id', None), getattr(hit, 'distance', 0.0), entity
 
     def _format_results_for_frontend_lite(self, results):
         formatted = []
         for hit in results:
             # 1. Normalize hitting format (Hit object vs Dict)
-            if isinstance(hit, dict):
-                # MilvusClient return
-                id_val = hit.get('id')
-                dist_val = hit.get('distance', 0.0)
-                entity = hit.get('entity', hit).copy() # Use copy to avoid modifying original
-            else:
-                # pymilvus Hit object
-                id_val = getattr(hit, 'id', None)
-                dist_val = getattr(hit, 'distance', 0.0)
-                entity = dict(hit.entity) if hasattr(hit, 'entity') else {}
-
-            # 2. Aggressive flattening of entity
-            # Some indexing scripts might nest 'entity' inside hit.entity
-            while 'entity' in entity and isinstance(entity['entity'], dict):
-                inner = entity.pop('entity')
-                entity.update(inner)
-            
-            # 3. Clean up entity (remove redundant fields)
-            entity.pop('vector', None)
-            entity.pop('distance', None)
-            
-            # 4. Construct clean hit_dict
+            id_val, dist_val, entity = self._unpack_hit(hit)
+            # Hits come fresh from Milvus for every query, so the entity is flattened in place
+            _flatten_entity(entity)
+
+            # 2. Construct clean hit_dict
             hit_dict = {
                 'id': id_val,
                 'distance': dist_val,
@@ -736,6 +1378,9 @@ class VectorSearchService:
 
     def get_fps_for_video(self, video_id):
         """Return FPS for a given video ID using the precomputed map."""
+        return self._fps_lookup(video_id)
+
+    def _fps_lookup_uncached(self, video_id):
         # Handle potential prefixes or extensions
         vid = video_id.replace('.mp4', '')
         # Special case: L16_V001 -> vid is already normalized
@@ -752,6 +1397,7 @@ class VectorSearchService:
             
             # Use keyframes as thumbnails (thumbnails deleted for space)
             if 'keyframe_path' in entity:
+                entity.setdefault('path', entity['keyframe_path'])
                 entity['thumbnail_path'] = entity['keyframe_path']
                 # 1. Video path extraction and batch identification
                 batch = "L01" # Default
@@ -781,19 +1427,29 @@ class VectorSearchService:
                 entity['fps'] = fps # Send FPS to frontend
                 
                 # Calculate REAL time from frame_id (Always accurate regardless of metadata corruption)
-                entity['time_seconds'] = float(fid) / fps
-                
-                # Format display time string HH:MM:SS.mmm
-                t_float = entity['time_seconds']
-                m, s = divmod(t_float, 60)
-                h, m = divmod(m, 60)
-                entity['time'] = f"{int(h):02d}:{int(m):02d}:{s:06.3f}"
+                # and the display string HH:MM:SS.mmm
+                entity['time_seconds'], entity['time'] = _frame_time(int(fid), fps)
                 
                 # 4. KIS segment for DRES submission
                 entity['kis_segment'] = self.calculate_kis_segment(int(fid), entity['time_seconds'], fps=fps)
                 
             return hit_dict
 
+    def _get_frame_ids(self, video_dir: Path) -> np.ndarray:
+        """Sorted keyframe ids in a video directory, cached until the directory's mtime changes"""
+        key = str(video_dir)
+        mtime = video_dir.stat().st_mtime
+        cached = self._frame_id_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        match = _FRAME_FILE_RE.fullmatch
+        with os.scandir(video_dir) as entries:
+            ids = np.fromiter((int(m.group(1)) for m in map(match, (entry.name for entry in entries)) if m), dtype=np.int64)
+        ids.sort()
+        self._frame_id_cache[key] = (mtime, ids)
+        return ids
+
     async def get_neighbors(self, video: str, frame_id: int, count: int = 3, stride: int = 25, keyframe_path: str = ''):
         """Find temporal neighbors for a frame from disk"""
         try:
@@ -818,78 +1474,52 @@ class VectorSearchService:
                 video_dir = keyframes_base / batch_folder / video
                 if not video_dir.exists(): return []
             
-            all_files = os.listdir(video_dir)
-            all_frame_ids = []
-            for f in all_files:
-                if f.endswith('.jpg'):
-                    try: all_frame_ids.append(int(f[:-4]))
-                    except: pass
-            all_frame_ids.sort()
-            
-            import bisect
-            curr_idx = bisect.bisect_left(all_frame_ids, frame_id)
-            
-            neighbors_before = []
-            scan_idx = curr_idx - 1
+            all_frame_ids = self._get_frame_ids(video_dir)
+            curr_idx = int(np.searchsorted(all_frame_ids, frame_id))
+
+            # Greedy stride selection: ids are sorted, so each next neighbor (the nearest id at
+            # least `stride` away from the previous pick) is one searchsorted jump, O(count log n)
+            before_ids = []
+            pos = curr_idx
             last_val = frame_id
-            while len(neighbors_before) < count and scan_idx >= 0:
-                cid = all_frame_ids[scan_idx]
-                if abs(last_val - cid) >= stride:
-                    # Construct normalized video ID (L01_V001)
-                    norm_video = video
-                    if '_' not in video and batch_folder:
-                        norm_video = f"{batch_folder}_{video}"
-                    
-                    # accurate time calculation based on precise video FPS
-                    fps = self.get_fps_for_video(norm_video)
-                    est_time_seconds = float(cid) / fps
-                    m, s = divmod(est_time_seconds, 60)
-                    h, m = divmod(m, 60)
-                    time_str = f"{int(h):02d}:{int(m):02d}:{s:06.3f}"
-
-                    neighbors_before.append({
-                        "keyframe_path": f"{batch_folder}/{v_dir_name}/{cid}.jpg",
-                        "thumbnail_path": f"{batch_folder}/{v_dir_name}/{cid}.jpg",
-                        "frame_id": cid, 
-                        "video": norm_video, 
-                        "time": time_str, 
-                        "time_seconds": est_time_seconds,
-                        "video_path": f"{norm_video}.mp4",
-                        "offset": cid - frame_id
-                    })
-                    last_val = cid
-                scan_idx -= 1
-            
-            neighbors_after = []
-            scan_idx = curr_idx + 1 if (curr_idx < len(all_frame_ids) and all_frame_ids[curr_idx] == frame_id) else curr_idx
+            while len(before_ids) < count and pos > 0:
+                pos = min(int(np.searchsorted(all_frame_ids, last_val - stride, side='right')) - 1, pos - 1)
+                if pos < 0: break
+                last_val = int(all_frame_ids[pos])
+                before_ids.append(last_val)
+
+            after_ids = []
+            pos = curr_idx + 1 if (curr_idx < len(all_frame_ids) and all_frame_ids[curr_idx] == frame_id) else curr_idx
             last_val = frame_id
-            while len(neighbors_after) < count and scan_idx < len(all_frame_ids):
-                cid = all_frame_ids[scan_idx]
-                if abs(cid - last_val) >= stride:
-                    # Construct normalized video ID (L01_V001)
-                    norm_video = video
-                    if '_' not in video and batch_folder:
-                        norm_video = f"{batch_folder}_{video}"
-
-                    # Accurate time calculation
-                    fps = self.get_fps_for_video(norm_video)
-                    est_time_seconds = float(cid) / fps
-                    m, s = divmod(est_time_seconds, 60)
-                    h, m = divmod(m, 60)
-                    time_str = f"{int(h):02d}:{int(m):02d}:{s:06.3f}"
-
-                    neighbors_after.append({
-                        "keyframe_path": f"{batch_folder}/{v_dir_name}/{cid}.jpg",
-                        "thumbnail_path": f"{batch_folder}/{v_dir_name}/{cid}.jpg",
-                        "frame_id": cid, 
-                        "video": norm_video, 
-                        "time": time_str, 
-                        "time_seconds": est_time_seconds,
-                        "video_path": f"{norm_video}.mp4",
-                        "offset": cid - frame_id
-                    })
-                    last_val = cid
-                scan_idx += 1
+            while len(after_ids) < count:
+                pos = max(int(np.searchsorted(all_frame_ids, last_val + stride, side='left')), pos)
+                if pos >= len(all_frame_ids): break
+                last_val = int(all_frame_ids[pos])
+                after_ids.append(last_val)
+                pos += 1
+
+            # Construct normalized video ID (L01_V001)
+            norm_video = video
+            if '_' not in video and batch_folder:
+                norm_video = f"{batch_folder}_{video}"
+            # accurate time calculation based on precise video FPS
+            fps = self.get_fps_for_video(norm_video)
+
+            def neighbor(cid):
+                est_time_seconds, time_str = _frame_time(cid, fps)
+                return {
+                    "keyframe_path": f"{batch_folder}/{v_dir_name}/{cid}.jpg",
+                    "thumbnail_path": f"{batch_folder}/{v_dir_name}/{cid}.jpg",
+                    "frame_id": cid, 
+                    "video": norm_video, 
+                    "time": time_str, 
+                    "time_seconds": est_time_seconds,
+                    "video_path": f"{norm_video}.mp4",
+                    "offset": cid - frame_id
+                }
+
+            neighbors_before = [neighbor(cid) for cid in before_ids]
+            neighbors_after = [neighbor(cid) for cid in after_ids]
                 
             return list(reversed(neighbors_before)) + neighbors_after
         except Exception as e:
@@ -31,6 +31,7 @@ try:
     
     clip_dim = text_features.shape[1]
     print(f"✓ CLIP embedding dimension: {clip_dim}")
+    print(f"✓ CLIP embedding dtype: {text_features.dtype}")
 except Exception as e:
     print(f"✗ Error loading CLIP: {e}")
     clip_dim = None
@@ -51,8 +52,9 @@ try:
     
     # Find vector field
     for field in schema.fields:
-        if field.dtype == 101:  # DataType.FLOAT_VECTOR
+        if field.dtype in (101, 102):  # DataType.FLOAT_VECTOR, DataType.FLOAT16_VECTOR
             print(f"✓ Vector field: {field.name}")
+            print(f"✓ Vector dtype: {'float16' if field.dtype == 102 else 'float32'}")
             print(f"✓ Vector dimension: {field.params.get('dim', 'N/A')}")
             milvus_dim = field.params.get('dim')
 except Exception as e:
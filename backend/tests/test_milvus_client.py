@@ -64,7 +64,7 @@ try:
         output_fields=["path", "frame_id", "video"],
         search_params={
             "metric_type": "COSINE",
-            "params": {"nprobe": 64}
+            "params": {"ef": 100}
         }
     )
     
@@ -53,5 +53,16 @@ async def test_result_format():
             except Exception as e:
                 print(f"   ✗ result.entity access FAILED: {e}")
 
+        # Display searches return only the pruned display fields (plus OCR/RAM when enabled)
+        entity_keys = set(first.get('entity', {}).keys())
+        assert {'keyframe_path', 'video', 'frame_id'} <= entity_keys, entity_keys
+        assert 'vector' not in entity_keys, "vector must never be fetched"
+
+    # Scoring-only searches (temporal second query) return exactly the scoring fields
+    scoring = await service.query_milvus(query_vector, limit=3, output_fields=['video', 'frame_id'])
+    if scoring:
+        assert set(scoring[0].get('entity', {}).keys()) == {'video', 'frame_id'}
+        print("\n4. ✓ Scoring-only search returns just video/frame_id")
+
 if __name__ == "__main__":
     asyncio.run(test_result_format())
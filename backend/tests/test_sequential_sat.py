@@ -1,5 +1,5 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
 
 url = "http://localhost:8000/SequentialQuery"
 data = {
@@ -8,7 +8,11 @@ data = {
 }
 
 print(f"Testing Sequential Query with SAT: {data['queries']}")
-resp = requests.post(url, json=data)
+# Keep-alive session: sockets are reused across calls instead of reconnecting per request
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
+resp = session.post(url, json=data)
 print(f"Status: {resp.status_code}")
 if resp.status_code == 200:
     result = resp.json()
@@ -27,6 +27,11 @@ async def test_direct():
     print(f"\n1. Encoding query: '{query}'")
     query_vector = service.encode_clip_text(query)
     print(f"   Vector shape: {query_vector.shape}")
+    # encode_clip_text returns one L2-normalized row (F.normalize over the last dim)
+    assert query_vector.ndim == 2 and query_vector.shape[0] == 1, f"unexpected shape {tuple(query_vector.shape)}"
+    norm = query_vector.float().norm(dim=-1).item()
+    assert abs(norm - 1.0) < 1e-2, f"vector not normalized (norm={norm:.4f})"
+    print(f"   Vector dtype: {query_vector.dtype}, norm: {norm:.4f}")
     
     # Call query_milvus directly
     print(f"\n2. Calling query_milvus()...")
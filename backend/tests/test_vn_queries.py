@@ -1,5 +1,6 @@
-import requests
-import json
+import asyncio
+import time
+import httpx
 
 # Test Vietnam news queries
 test_queries = [
@@ -9,18 +10,28 @@ test_queries = [
     "họp báo tại tp.hcm",
 ]
 
-print("Testing Vietnam News Dictionary...")
-print("=" * 60)
-
-for query in test_queries:
-    print(f"\nQuery: '{query}'")
-    
-    response = requests.post(
+async def run_one(client, query):
+    response = await client.post(
         "http://localhost:8000/TextQuery",
         json={"First_query": query, "top_k": 3},
         headers={"Content-Type": "application/json"}
     )
-    
+    return query, response
+
+async def main():
+    # One pooled client; all queries are in flight at once
+    async with httpx.AsyncClient(timeout=30) as client:
+        return await asyncio.gather(*(run_one(client, q) for q in test_queries))
+
+print("Testing Vietnam News Dictionary...")
+print("=" * 60)
+
+start_time = time.time()
+results = asyncio.run(main())
+elapsed = time.time() - start_time
+
+for query, response in results:
+    print(f"\nQuery: '{query}'")
     if response.status_code == 200:
         result = response.json()
         print(f"  Status: ✅ HTTP 200")
@@ -30,4 +41,4 @@ for query in test_queries:
         print(f"  Error: {response.text}")
 
 print("\n" + "=" * 60)
-print("Test complete!")
+print(f"Test complete! ({len(test_queries)} queries in {elapsed:.3f}s)")
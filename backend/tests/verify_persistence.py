@@ -39,7 +39,7 @@ async def test_persistence():
     print(f"First translation: '{translated1}' (took {duration1:.4f}s)")
     
     # Verify file exists
-    cache_file = Path(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "translations.json"))
+    cache_file = Path(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "translations.db"))
     if cache_file.exists():
         print(f"✅ Persistent translation cache file created: {cache_file}")
     else:
@@ -69,21 +69,24 @@ async def test_persistence():
     duration1 = time.time() - start
     print(f"First encoding took {duration1:.4f}s")
     
-    emb_file = Path(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "clip_embeddings.json"))
-    if emb_file.exists():
-        print(f"✅ Persistent embedding cache file created: {emb_file}")
+    # fp16 rows + key list, namespaced by model (see VectorSearchService._load_embedding_cache)
+    emb_file, keys_file = service.embedding_cache_file, service.embedding_keys_file
+    if emb_file.exists() and keys_file.exists():
+        print(f"✅ Persistent embedding cache files created: {emb_file.name}, {keys_file.name}")
     else:
         print(f"❌ Persistent embedding cache file NOT found")
 
-    # Simulate restart
+    # Simulate restart: the new service reuses the process-wide CLIP model, so this
+    # measures only the persistent-cache lookup
     new_service = VectorSearchService(config)
     start = time.time()
     emb2 = new_service.encode_clip_text("bicycle in rain")
     duration2 = time.time() - start
     print(f"Second encoding (post-restart) took {duration2:.4f}s")
     
-    if duration2 < duration1 or duration2 < 0.01:
-        print(f"✅ Embedding persistence verified (Speedup: {duration1/max(duration2, 0.0001):.1f}x)")
+    speedup = duration1 / max(duration2, 0.0001)
+    if speedup > 10 or duration2 < 0.001:
+        print(f"✅ Embedding persistence verified (Speedup: {speedup:.1f}x)")
     else:
         print(f"❌ Embedding persistence might not be working as expected")
 
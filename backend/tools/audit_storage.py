@@ -1,6 +1,9 @@
 from pymilvus import connections, utility, Collection
 import os
 
+# Load state is an extra RPC per collection; only query it when asked (DEBUG_STATS=1)
+DEBUG_STATS = bool(os.getenv("DEBUG_STATS"))
+
 connections.connect(host="localhost", port=19530)
 
 print("=" * 60)
@@ -12,7 +15,8 @@ for name in collections:
     c = Collection(name)
     print(f"Collection: {name}")
     print(f"  - Count: {c.num_entities:,}")
-    print(f"  - Load Status: {utility.load_state(name)}")
+    if DEBUG_STATS:
+        print(f"  - Load Status: {utility.load_state(name)}")
 
 print("\n" + "=" * 60)
 print("PROPOSED ACTIONS:")
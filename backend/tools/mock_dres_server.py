@@ -5,15 +5,62 @@ Minimal implementation of DRES API v2 for testing frontend login/submit
 """
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
+from contextlib import asynccontextmanager
+import asyncio
+import atexit
 import uvicorn
-import json
+import orjson
 from datetime import datetime
 import os
 
-app = FastAPI(title="Mock DRES Server", version="2.0.0")
+# Submission log records are queued by the handlers and written in batches by a background
+# task, so request handling never blocks on disk I/O. The log file is opened once at startup
+# and kept open; each batch is one buffered write + flush instead of an open/close per record.
+LOG_BATCH_SIZE = 64
+log_queue: "asyncio.Queue[bytes]" = None
+log_fp = None
+
+def _append_log(chunk: bytes):
+    log_fp.write(chunk)
+    log_fp.flush()
+
+def _close_log():
+    if log_fp is not None and not log_fp.closed:
+        log_fp.flush()
+        os.fsync(log_fp.fileno())
+        log_fp.close()
+
+async def drain_log_queue():
+    """Write queued log records, batching whatever accumulated while the last write ran"""
+    while True:
+        records = [await log_queue.get()]
+        while len(records) < LOG_BATCH_SIZE and not log_queue.empty():
+            records.append(log_queue.get_nowait())
+        try:
+            await asyncio.to_thread(_append_log, b"".join(records))
+        except Exception as e:
+            print(f"❌ Log write error: {e}")
+        finally:
+            for _ in records: log_queue.task_done()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global log_queue, log_fp
+    log_fp = open(log_file, "ab", buffering=8192)
+    atexit.register(_close_log)
+    log_queue = asyncio.Queue()
+    writer = asyncio.create_task(drain_log_queue())
+    yield
+    # Flush what is still queued, then fsync once on shutdown
+    await log_queue.join()
+    writer.cancel()
+    _close_log()
+
+app = FastAPI(title="Mock DRES Server", version="2.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Enable CORS
 app.add_middleware(
@@ -46,7 +93,7 @@ class SubmissionAnswerSet(BaseModel):
     answers: List[dict]
 
 class SubmissionRequest(BaseModel):
-    session: str
+    session: Optional[str] = None  # DRES clients usually send it as a query parameter
     answerSets: List[SubmissionAnswerSet]
 
 # Mock data
@@ -122,26 +169,28 @@ async def current_evaluation():
     return MOCK_EVALUATION
 
 @app.post("/api/v2/submit/{evaluation_id}")
-async def submit_answer(evaluation_id: str, request: Request):
-    """Submit answer endpoint"""
+async def submit_answer(evaluation_id: str, submission: SubmissionRequest, session: Optional[str] = None):
+    """Submit answer endpoint (body parsed and validated by pydantic-core)"""
+    # The session may come as ?session=... (SearchPanel, DRESClient) or in the body
+    if not (session or submission.session):
+        raise HTTPException(status_code=401, detail="Missing session")
     try:
-        body = await request.json()
+        body = submission.model_dump(exclude_none=True)
         
         timestamp = datetime.now().isoformat()
-        submission = {
+        submissions.append({
             "timestamp": timestamp,
             "evaluation_id": evaluation_id,
             "body": body
-        }
-        
-        submissions.append(submission)
+        })
         
-        # Log to file
-        with open(log_file, "a") as f:
-            f.write(f"\n{'='*80}\n")
-            f.write(f"Submission at {timestamp}\n")
-            f.write(f"Evaluation ID: {evaluation_id}\n")
-            f.write(f"{json.dumps(body, indent=2)}\n")
+        # Log to file (queued; written by drain_log_queue)
+        log_queue.put_nowait(
+            f"\n{'='*80}\n"
+            f"Submission at {timestamp}\n"
+            f"Evaluation ID: {evaluation_id}\n".encode()
+            + orjson.dumps(body, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        )
         
         # Pretty print to console
         print(f"\n{'='*80}")
@@ -149,8 +198,8 @@ async def submit_answer(evaluation_id: str, request: Request):
         print(f"{'='*80}")
         print(f"Evaluation ID: {evaluation_id}")
         
-        if "answerSets" in body and len(body["answerSets"]) > 0:
-            answers = body["answerSets"][0]["answers"]
+        if submission.answerSets:
+            answers = submission.answerSets[0].answers
             for idx, answer in enumerate(answers, 1):
                 print(f"\nAnswer {idx}:")
                 if "mediaItemName" in answer:
@@ -4,14 +4,60 @@ Optimization utilities for search system
 Includes caching, diversity, and reranking helpers
 """
 
+import os
+import sys
 import time
+import asyncio
+import pickle
 import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Any, Optional
-from collections import defaultdict
 from pathlib import Path
 import torch
 import torch.nn.functional as F
-from PIL import Image
+import numpy as np
+from PIL import Image, features as pil_features
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _diversity_keep(video_ids, frames, n_videos, min_gap_frames, max_per_video, max_results):
+    """Return indices kept by the diversity filter, in input order
+
+    The gap is measured from the last *kept* frame of the same video, so each decision
+    depends on the previous ones; this runs as one pass over integer arrays.
+    """
+    n = video_ids.shape[0]
+    counts = np.zeros(n_videos, np.int64)
+    last_frame = np.zeros(n_videos, np.int64)
+    has_last = np.zeros(n_videos, np.bool_)
+    keep = np.empty(n, np.int64)
+    n_kept = 0
+    for i in range(n):
+        v = video_ids[i]
+        if counts[v] >= max_per_video: continue
+        if has_last[v] and abs(frames[i] - last_frame[v]) < min_gap_frames: continue
+        keep[n_kept] = i
+        n_kept += 1
+        counts[v] += 1
+        last_frame[v] = frames[i]
+        has_last[v] = True
+        if n_kept >= max_results: break
+    return keep[:n_kept]
+
+if NUMBA_AVAILABLE:
+    _diversity_keep = njit(cache=True, nogil=True)(_diversity_keep)
 
 
 class SearchOptimizer:
@@ -19,19 +65,26 @@ class SearchOptimizer:
     
     def __init__(self, logger):
         self.logger = logger
-        self.result_cache: Dict[str, Tuple[float, List]] = {}
+        # LRU order (oldest first) + per-entry TTL; hits and evictions are O(1)
+        self.result_cache: "OrderedDict[str, Tuple[float, List]]" = OrderedDict()
         self.cache_ttl = 300  # 5 minutes
+        self.cache_max_entries = 1000
     
     def get_cache_key(self, first_query: str, second_query: str = "") -> str:
         """Generate cache key for query"""
-        query_str = f"{first_query}|{second_query}"
-        return hashlib.md5(query_str.encode()).hexdigest()
+        query_str = f"{first_query}|{second_query}".encode()
+        # In-process dict key, not a security boundary: a fast 64-bit hash is enough
+        if XXHASH_AVAILABLE:
+            return xxhash.xxh3_64_hexdigest(query_str)
+        return hashlib.blake2b(query_str, digest_size=8).hexdigest()
     
     def get_cached_results(self, cache_key: str) -> Optional[List]:
         """Get cached results if valid"""
-        if cache_key in self.result_cache:
-            timestamp, results = self.result_cache[cache_key]
+        entry = self.result_cache.get(cache_key)
+        if entry is not None:
+            timestamp, results = entry
             if time.time() - timestamp < self.cache_ttl:
+                self.result_cache.move_to_end(cache_key)
                 self.logger.info(f"✅ Cache hit for query: {cache_key[:8]}...")
                 return results
             else:
@@ -42,13 +95,11 @@ class SearchOptimizer:
     def cache_results(self, cache_key: str, results: List):
         """Cache search results"""
         self.result_cache[cache_key] = (time.time(), results)
+        self.result_cache.move_to_end(cache_key)
         
-        # Cleanup old cache entries (keep max 1000)
-        if len(self.result_cache) > 1000:
-            # Remove oldest 100 entries
-            sorted_keys = sorted(self.result_cache.items(), key=lambda x: x[1][0])
-            for key, _ in sorted_keys[:100]:
-                del self.result_cache[key]
+        # Evict least recently used entries beyond the cap
+        while len(self.result_cache) > self.cache_max_entries:
+            self.result_cache.popitem(last=False)
         
         self.logger.info(f"📦 Cached results for: {cache_key[:8]}... (total cache: {len(self.result_cache)})")
     
@@ -56,7 +107,8 @@ class SearchOptimizer:
     def enforce_diversity(
         results: List[Any],
         min_gap_frames: int = 50,
-        max_per_video: int = 5
+        max_per_video: int = 5,
+        max_results: int = 100
     ) -> List[Any]:
         """
         Enforce temporal diversity in results
@@ -65,48 +117,121 @@ class SearchOptimizer:
             results: List of search results
             min_gap_frames: Minimum frame gap within same video
             max_per_video: Maximum results per video
+            max_results: Maximum number of results returned
             
         Returns:
             Filtered results with enforced diversity
         """
-        selected = []
-        video_counts = defaultdict(int)
-        last_frames = {}
+        if not results:
+            return []
         
-        for result in results:
-            # Extract video and frame info
-            entity = result.get('entity', {})
-            video = entity.get('video', '')
-            frame_id = entity.get('frame_id', 0)
-            
-            # Check video limit
-            if video_counts[video] >= max_per_video:
-                continue
-            
-            # Check temporal gap within same video
-            if video in last_frames:
-                if abs(frame_id - last_frames[video]) < min_gap_frames:
-                    continue
-            
-            selected.append(result)
-            video_counts[video] += 1
-            last_frames[video] = frame_id
-            
-            if len(selected) >= 100:
-                break
+        # Extract video and frame info once into integer arrays
+        entities = [result.get('entity', {}) for result in results]
+        _, video_ids = np.unique(np.array([e.get('video', '') for e in entities], dtype=object), return_inverse=True)
+        frames = np.fromiter((e.get('frame_id', 0) for e in entities), dtype=np.int64, count=len(entities))
         
-        return selected
+        keep = _diversity_keep(video_ids.astype(np.int64), frames, int(video_ids.max()) + 1, min_gap_frames, max_per_video, max_results)
+        return [results[i] for i in keep]
+
+
+# Batch sizes tried (ascending) when auto-tuning the rerank batch to free VRAM
+RERANK_BATCH_CANDIDATES = (32, 64, 128, 256)
 
 
 class CLIPReranker:
     """CLIP-based reranking for search results"""
     
-    def __init__(self, clip_model, clip_preprocess, device, logger, keyframes_base_path="/home/ir/retrievalSystem/data/keyframes"):
+    def __init__(self, clip_model, clip_preprocess, device, logger, keyframes_base_path="/home/ir/retrievalSystem/data/keyframes", max_workers: Optional[int] = None, prebaked_index: Optional[str] = None, batch_size: Optional[int] = None):
         self.clip_model = clip_model
         self.clip_preprocess = clip_preprocess
         self.device = device
         self.logger = logger
         self.keyframes_base_path = Path(keyframes_base_path)
+        # JPEG decode and resize release the GIL, so a thread pool scales with cores
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count(), thread_name_prefix="rerank-decode")
+        # GPU encode runs off the event loop on one thread, which also serializes use of the staging buffer
+        self._score_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank-gpu")
+        self._log_pil_build()
+        # Preprocess output shape (3, S, S) for the model, e.g. S=378 for ViT-H-14-378
+        self._image_shape = tuple(self.clip_preprocess(Image.new('RGB', (32, 32))).shape)
+        self._encode = self._compile_encoder()
+        # None: auto-tuned to free VRAM here, once, on CUDA (64 on CPU)
+        if batch_size is None:
+            batch_size = self._autotune_batch_size() if 'cuda' in str(device) else 64
+        self.batch_size = batch_size
+        # Pinned upload buffer; every batch is zero-padded to batch_size so the compiled
+        # encoder only ever sees one shape
+        self._staging = torch.empty((batch_size, *self._image_shape), pin_memory='cuda' in str(device))
+        self._prebaked = None
+        self._prebaked_rows: Dict[str, int] = {}
+        if prebaked_index:
+            self._load_prebaked_index(prebaked_index)
+    
+    def _compile_encoder(self):
+        """torch.compile the image tower on CUDA (fused ViT kernels + CUDA graphs), eager elsewhere"""
+        encode = self.clip_model.encode_image
+        if 'cuda' not in str(self.device) or not hasattr(torch, 'compile') or sys.platform == 'win32':
+            return encode
+        if hasattr(encode, '_torchdynamo_orig_callable'):
+            return encode  # the service already compiled this model
+        try:
+            # dynamic=False: batches are padded to batch_size, so a single graph is captured
+            return torch.compile(encode, mode='reduce-overhead', dynamic=False, fullgraph=False)
+        except Exception as e:
+            self.logger.warning(f"torch.compile unavailable, using eager encode_image: {e}")
+            return encode
+    
+    def _autotune_batch_size(self) -> int:
+        """Largest batch in RERANK_BATCH_CANDIDATES whose forward fits in 80% of free VRAM"""
+        # Probe the uncompiled encoder (the service may have compiled it already) so no
+        # graphs are compiled for rejected sizes
+        encode = getattr(self._encode, '_torchdynamo_orig_callable', self._encode)
+        free, _ = torch.cuda.mem_get_info(self.device)
+        budget = 0.8 * free
+        best = RERANK_BATCH_CANDIDATES[0]
+        for candidate in RERANK_BATCH_CANDIDATES:
+            torch.cuda.reset_peak_memory_stats(self.device)
+            base = torch.cuda.memory_allocated(self.device)
+            try:
+                dummy = torch.zeros((candidate, *self._image_shape), device=self.device)
+                with torch.no_grad(), torch.amp.autocast(device_type='cuda', dtype=torch.float16):
+                    encode(dummy)
+                torch.cuda.synchronize(self.device)
+            except torch.cuda.OutOfMemoryError:
+                break
+            finally:
+                dummy = None
+            if torch.cuda.max_memory_allocated(self.device) - base > budget:
+                break
+            best = candidate
+        torch.cuda.empty_cache()
+        self.logger.info(f"Rerank batch size auto-tuned to {best}")
+        return best
+    
+    def _load_prebaked_index(self, index_path: str):
+        """Map the uint8 keyframe tensor written by tools/prebake_keyframes.py"""
+        try:
+            with open(index_path, 'rb') as f:
+                meta = pickle.load(f)
+            data_file = Path(index_path).with_name(meta['data_file'])
+            self._prebaked = np.memmap(data_file, dtype=np.uint8, mode='r', shape=tuple(meta['shape']))
+            self._prebaked_rows = meta['index']
+            self._prebaked_mean = torch.tensor(meta['mean'], device=self.device).view(1, 3, 1, 1)
+            self._prebaked_std = torch.tensor(meta['std'], device=self.device).view(1, 3, 1, 1)
+            self.logger.info(f"Using pre-baked keyframes: {len(self._prebaked_rows):,} rows from {data_file.name}")
+        except Exception as e:
+            self.logger.warning(f"Pre-baked keyframes unavailable, decoding JPEGs: {e}")
+            self._prebaked = None
+            self._prebaked_rows = {}
+    
+    def _log_pil_build(self):
+        """Report whether decode/resize run on the fast builds (Pillow-SIMD, libjpeg-turbo)"""
+        import PIL
+        simd = ".post" in PIL.__version__  # Pillow-SIMD versions carry a .postN suffix
+        turbo = bool(pil_features.check_feature("libjpeg_turbo"))
+        self.logger.info(f"PIL {PIL.__version__} (SIMD: {simd}, libjpeg-turbo: {turbo})")
+        if not (simd and turbo):
+            self.logger.info("Keyframe decode is faster with pillow-simd built against libjpeg-turbo (see requirements.txt)")
     
     async def rerank(self, query_embedding: torch.Tensor, candidates: List[Any], top_k: int = 100) -> List[Any]:
         """
@@ -122,43 +247,53 @@ class CLIPReranker:
         """
         if not candidates:
             return candidates
+        loop = asyncio.get_running_loop()
+        batch_size = self.batch_size
         
         reranked = []
-        batch_images = []
-        batch_candidates = []
+        valid_candidates = []
+        valid_paths = []
+        baked_candidates = []
+        baked_rows = []
         
-        # Collect images in batches
+        # Collect candidates that are pre-baked or have a keyframe on disk
         for candidate in candidates[:500]:  # Rerank depth increased to 500
             entity = candidate.get('entity', {})
             keyframe_path = entity.get('keyframe_path', '')
             
+            row = self._prebaked_rows.get(keyframe_path.replace('\\', '/')) if keyframe_path else None
+            if row is not None:
+                baked_candidates.append(candidate)
+                baked_rows.append(row)
             # Build full path
-            if keyframe_path:
+            elif keyframe_path:
                 full_path = self.keyframes_base_path / keyframe_path
                 
                 if full_path.exists():
-                    batch_candidates.append(candidate)
-                    batch_images.append(str(full_path))
-                    
-                    # Process batch when full
-                    if len(batch_images) >= 16:
-                        scores = await self._compute_clip_scores_batch(
-                            query_embedding, batch_images
-                        )
-                        
-                        for cand, score in zip(batch_candidates, scores):
-                            cand['distance'] = float(score)
-                            reranked.append(cand)
-                        
-                        batch_images = []
-                        batch_candidates = []
+                    valid_candidates.append(candidate)
+                    valid_paths.append(str(full_path))
+        
+        # Pre-baked keyframes: one memmap slice per batch, no decode (rows sorted for locality)
+        baked_rows = np.asarray(baked_rows, dtype=np.int64)
+        order = np.argsort(baked_rows, kind='stable')
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            scores = await loop.run_in_executor(self._score_executor, self._score_prebaked, query_embedding, baked_rows[chunk])
+            for j, score in zip(chunk, scores):
+                baked_candidates[j]['distance'] = float(score)
+                reranked.append(baked_candidates[j])
+        
+        batches = [(i, min(i + batch_size, len(valid_paths))) for i in range(0, len(valid_paths), batch_size)]
         
-        # Process remaining batch
-        if batch_images:
-            scores = await self._compute_clip_scores_batch(
-                query_embedding, batch_images
-            )
-            for cand, score in zip(batch_candidates, scores):
+        # Pipeline: batch i+1 is submitted to the decode pool before batch i is encoded
+        pending = self._load_images(valid_paths[slice(*batches[0])]) if batches else None
+        for i, (start, end) in enumerate(batches):
+            images = await pending
+            if i + 1 < len(batches):
+                pending = self._load_images(valid_paths[slice(*batches[i + 1])])
+            scores = await loop.run_in_executor(self._score_executor, self._score_images, query_embedding, images)
+            
+            for cand, score in zip(valid_candidates[start:end], scores):
                 cand['distance'] = float(score)
                 reranked.append(cand)
         
@@ -169,34 +304,66 @@ class CLIPReranker:
         
         return reranked[:top_k]
     
-    async def _compute_clip_scores_batch(self, query_embedding: torch.Tensor, image_paths: List[str]) -> List[float]:
-        """Compute CLIP similarity scores for a batch of images"""
+    def _load_one(self, path: str) -> torch.Tensor:
+        """Decode and preprocess one keyframe (runs in the decode pool)"""
         try:
-            # Load and preprocess images
-            images = []
-            for path in image_paths:
-                try:
-                    img = Image.open(path).convert('RGB')
-                    images.append(self.clip_preprocess(img))
-                except Exception as e:
-                    self.logger.warning(f"Failed to load image {path}: {e}")
-                    images.append(torch.zeros(3, 224, 224))  # Placeholder
-            
-            if not images:
-                return [0.0] * len(image_paths)
-            
-            # Batch encode images
-            image_batch = torch.stack(images).to(self.device)
-            
-            with torch.no_grad():
-                image_features = self.clip_model.encode_image(image_batch)
+            img = Image.open(path)
+            img.draft('RGB', self._image_shape[1:])  # reduced-scale JPEG decode, never below the crop; no-op for other formats
+            img = img.convert('RGB')
+            return self.clip_preprocess(img)
+        except Exception as e:
+            self.logger.warning(f"Failed to load image {path}: {e}")
+            return torch.zeros(self._image_shape)  # Placeholder
+    
+    def _load_images(self, image_paths: List[str]) -> "asyncio.Future[List[torch.Tensor]]":
+        """Submit a batch of keyframes to the decode pool now; await the result to collect it"""
+        loop = asyncio.get_running_loop()
+        return asyncio.gather(*(loop.run_in_executor(self._pool, self._load_one, path) for path in image_paths))
+    
+    def _score_prebaked(self, query_embedding: torch.Tensor, rows: np.ndarray) -> List[float]:
+        """Gather pre-baked uint8 keyframes, normalize them on the device and score them"""
+        count = len(rows)
+        # Pad with copies of the last row up to the fixed batch shape; padded scores are dropped
+        rows = np.pad(rows, (0, self.batch_size - count), mode='edge')
+        pixels = torch.from_numpy(self._prebaked[rows])
+        image_batch = pixels.to(self.device, non_blocking=True).float().div_(255).sub_(self._prebaked_mean).div_(self._prebaked_std)
+        return self._score_batch(query_embedding, image_batch, count)
+    
+    def _score_images(self, query_embedding: torch.Tensor, images: List[torch.Tensor]) -> List[float]:
+        """Encode preprocessed images and return their cosine similarity to the query"""
+        if not images:
+            return []
+        staging = self._staging
+        # Fill the pinned buffer in place (zero-padded tail) and upload it with one async DMA. The
+        # previous upload from it has completed: scoring synchronizes on .cpu() before returning.
+        for i, image in enumerate(images):
+            staging[i].copy_(image)
+        staging[len(images):].zero_()
+        return self._score_batch(query_embedding, staging.to(self.device, non_blocking=True), len(images))
+    
+    def _score_batch(self, query_embedding: torch.Tensor, image_batch: torch.Tensor, count: int) -> List[float]:
+        """Encode a padded image batch and return the similarity of its first count rows to the query"""
+        try:
+            # FP16 on CUDA: tensor-core matmuls and half the activation traffic through the ViT
+            is_cuda = 'cuda' in str(self.device)
+            with torch.no_grad(), torch.amp.autocast(device_type='cuda', dtype=torch.float16, enabled=is_cuda):
+                image_features = self._encode(image_batch)
                 image_features = F.normalize(image_features, p=2, dim=-1)
                 
                 # Compute cosine similarity
-                similarities = (query_embedding @ image_features.T).squeeze(0)
+                similarities = (query_embedding.to(image_features.dtype) @ image_features.T).squeeze(0)[:count]
                 
-            return similarities.cpu().tolist()
+            return similarities.float().cpu().tolist()
             
         except Exception as e:
             self.logger.error(f"Error in batch CLIP scoring: {e}")
-            return [0.0] * len(image_paths)
+            return [0.0] * count
+    
+    async def _compute_clip_scores_batch(self, query_embedding: torch.Tensor, image_paths: List[str]) -> List[float]:
+        """Compute CLIP similarity scores for a batch of images"""
+        loop = asyncio.get_running_loop()
+        scores = []
+        for start in range(0, len(image_paths), self.batch_size):
+            images = await self._load_images(image_paths[start:start + self.batch_size])
+            scores.extend(await loop.run_in_executor(self._score_executor, self._score_images, query_embedding, images))
+        return scores
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Pre-bake keyframes for CLIP reranking
+Decodes every keyframe once, applies the CLIP resize/crop (no normalization) and stores
+the uint8 CHW pixels in a single memmapped file, so reranking reads one contiguous slice
+instead of decoding and resizing full-resolution JPEGs per query.
+
+Outputs (in output_dir):
+    keyframes_<model>.u8.bin     uint8 [N, 3, S, S]
+    keyframes_<model>.index.pkl  {"data_file", "shape", "mean", "std", "index": {keyframe_path: row}}
+
+Pass the .index.pkl path to CLIPReranker(prebaked_index=...).
+"""
+
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import open_clip
+from PIL import Image
+from torchvision import transforms as T
+from tqdm import tqdm
+
+# Configuration
+CONFIG = {
+    "keyframes_dir": os.path.join(os.path.dirname(__file__), "..", "..", "data", "keyframes"),
+    "output_dir": os.path.join(os.path.dirname(__file__), "..", "data", "cache"),
+    "clip_model_name": "ViT-H-14-378-quickgelu",
+    "clip_pretrained": "dfn5b",
+    "workers": os.cpu_count(),
+}
+
+def split_preprocess(preprocess):
+    """Split an open_clip eval transform into (geometric part, mean, std)"""
+    steps = preprocess.transforms
+    to_tensor = next(i for i, t in enumerate(steps) if isinstance(t, T.ToTensor))
+    normalize = next(t for t in steps if isinstance(t, T.Normalize))
+    return T.Compose(steps[:to_tensor]), tuple(normalize.mean), tuple(normalize.std)
+
+def main():
+    keyframes_dir = Path(CONFIG["keyframes_dir"]).absolute()
+    output_dir = Path(CONFIG["output_dir"]).absolute()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"Loading preprocessing for {CONFIG['clip_model_name']}...")
+    _, _, preprocess = open_clip.create_model_and_transforms(CONFIG["clip_model_name"], pretrained=CONFIG["clip_pretrained"])
+    geometric, mean, std = split_preprocess(preprocess)
+
+    paths = sorted(p for p in keyframes_dir.rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp"))
+    if not paths:
+        raise SystemExit(f"No keyframes found under {keyframes_dir}")
+    size = np.asarray(geometric(Image.open(paths[0]).convert("RGB"))).shape[0]
+    shape = (len(paths), 3, size, size)
+    print(f"Keyframes: {len(paths):,} -> {shape} uint8 ({np.prod(shape) / 1e9:.1f} GB)")
+
+    stem = f"keyframes_{CONFIG['clip_model_name']}"
+    data_file = output_dir / f"{stem}.u8.bin"
+    pixels = np.memmap(data_file, dtype=np.uint8, mode="w+", shape=shape)
+
+    def bake(row):
+        img = Image.open(paths[row])
+        img.draft("RGB", (size, size))  # reduced-scale JPEG decode; no-op for other formats
+        pixels[row] = np.asarray(geometric(img.convert("RGB"))).transpose(2, 0, 1)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=CONFIG["workers"]) as pool:
+        list(tqdm(pool.map(bake, range(len(paths))), total=len(paths), desc="Baking"))
+    pixels.flush()
+    del pixels
+
+    index = {str(p.relative_to(keyframes_dir).as_posix()): row for row, p in enumerate(paths)}
+    with open(output_dir / f"{stem}.index.pkl", "wb") as f:
+        pickle.dump({"data_file": data_file.name, "shape": shape, "mean": mean, "std": std, "index": index}, f)
+
+    print(f"✅ Baked {len(paths):,} keyframes in {time.time() - start:.1f}s -> {data_file}")
+
+if __name__ == "__main__":
+    main()
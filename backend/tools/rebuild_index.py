@@ -0,0 +1,62 @@
+"""
+Rebuild the vector index of an existing collection in place (no re-insert)
+
+Quantized indexes keep 1 byte per dimension instead of 4, so probed cells/graph
+neighbours move a quarter of the bytes:
+    python rebuild_index.py IVF_SQ8      # nlist = 4 * sqrt(N), searched with nprobe
+    python rebuild_index.py HNSW_SQ      # Milvus >= 2.5, searched with ef
+    python rebuild_index.py HNSW         # full-precision graph (reindex_milvus.py default)
+The backend picks ef or nprobe from the index type it finds at startup.
+"""
+
+import sys
+import math
+import time
+from pymilvus import connections, utility, Collection
+
+# Configuration
+MILVUS_HOST = "localhost"
+MILVUS_PORT = 19530
+COLLECTION_NAME = "AIC_2024_TransNetV2_Full"
+
+INDEX_TYPE = sys.argv[1].upper() if len(sys.argv) > 1 else "IVF_SQ8"
+
+def index_params(index_type: str, num_entities: int) -> dict:
+    if index_type == "IVF_SQ8":
+        nlist = max(1, min(65536, 4 * int(math.sqrt(num_entities))))
+        return {"metric_type": "COSINE", "index_type": "IVF_SQ8", "params": {"nlist": nlist}}
+    if index_type == "HNSW_SQ":
+        return {"metric_type": "COSINE", "index_type": "HNSW_SQ", "params": {"M": 24, "efConstruction": 200, "sq_type": "SQ8"}}
+    if index_type == "HNSW":
+        return {"metric_type": "COSINE", "index_type": "HNSW", "params": {"M": 24, "efConstruction": 200}}
+    raise SystemExit(f"Unsupported index type: {index_type} (use IVF_SQ8, HNSW_SQ or HNSW)")
+
+print("=" * 60)
+print(f"REBUILDING '{COLLECTION_NAME}' INDEX AS {INDEX_TYPE}")
+print("=" * 60)
+
+connections.connect(host=MILVUS_HOST, port=MILVUS_PORT)
+if not utility.has_collection(COLLECTION_NAME):
+    raise SystemExit(f"Collection {COLLECTION_NAME} not found")
+
+collection = Collection(COLLECTION_NAME)
+params = index_params(INDEX_TYPE, collection.num_entities)
+print(f"Entities: {collection.num_entities:,}")
+print(f"Index params: {params}")
+
+# An index can only be dropped from a released collection
+collection.release()
+for index in collection.indexes:
+    if index.field_name == "vector":
+        print(f"Dropping {index.params.get('index_type')} index...")
+        collection.drop_index(index_name=index.index_name)
+
+start = time.time()
+collection.create_index(field_name="vector", index_params=params)
+utility.wait_for_index_building_complete(COLLECTION_NAME)
+print(f"✅ {INDEX_TYPE} index built in {time.time() - start:.1f}s")
+
+collection.load()
+print("✅ Collection loaded and ready for search")
+
+connections.disconnect("default")
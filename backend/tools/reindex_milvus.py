@@ -86,8 +86,8 @@ for meta_file, vector_file in tqdm(zip(meta_files, vector_files), desc="Processi
     for i in range(0, num_records, batch_size):
         end = min(i + batch_size, num_records)
         
-        # Convert numpy array to list properly (each vector as a list)
-        batch_vectors = [vec.tolist() for vec in vectors[i:end]]
+        # float32 2-D view; pymilvus serializes ndarray rows directly (no per-float Python objects)
+        batch_vectors = vectors[i:end]
         
         batch_data = [
             batch_vectors,
@@ -109,7 +109,7 @@ index_params = {
     "metric_type": "COSINE",
     "index_type": "HNSW",
     "params": {
-        "M": 16,        # Number of bi-directional links
+        "M": 24,        # Number of bi-directional links
         "efConstruction": 200  # Search depth during construction
     }
 }
@@ -77,7 +77,7 @@ def main():
             end = min(i + CONFIG["batch_size"], num_records)
             
             # Prepare Milvus data format
-            batch_vectors = [v.tolist() for v in vectors[i:end]]
+            batch_vectors = vectors[i:end]  # float32 2-D view, no per-float Python objects
             batch_videos = meta_df['video'].iloc[i:end].tolist()
             batch_frames = meta_df['frame_id'].iloc[i:end].astype(int).tolist()
             batch_keyframe_paths = meta_df['path'].iloc[i:end].tolist() # Map 'path' meta to 'keyframe_path' field
@@ -96,7 +96,7 @@ def main():
     index_params = {
         "metric_type": "COSINE",
         "index_type": "HNSW",
-        "params": {"M": 16, "efConstruction": 200}
+        "params": {"M": 24, "efConstruction": 200}
     }
     collection.create_index(field_name="vector", index_params=index_params)
     
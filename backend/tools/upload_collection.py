@@ -43,9 +43,9 @@ def create_collection(client):
     index_params = client.prepare_index_params()
     index_params.add_index(
         field_name="vector",
-        index_type="IVF_FLAT",
+        index_type="HNSW",
         metric_type="COSINE",
-        params={"nlist": 1024}
+        params={"M": 24, "efConstruction": 200}
     )
     client.create_index(COLLECTION_NAME, index_params)
     print("Collection created successfully")
@@ -56,31 +56,31 @@ def upload_batch(client, batch_id, vectors_file, meta_file):
     print(f"Uploading {batch_id}...")
     
     # Load data
-    vectors = np.load(vectors_file)
+    vectors = np.load(vectors_file).astype(np.float32, copy=False)
     meta_df = pd.read_csv(meta_file)
     
     print(f"Loaded {len(vectors)} vectors, {len(meta_df)} metadata rows")
     
-    # Prepare data
-    data = []
-    for idx, row in meta_df.iterrows():
-        data.append({
-            "frame_id": int(row['frame_id']),
-            "vector": vectors[idx].tolist(),
-            "keyframe_path": str(row['keyframe_path']),
-            "video": str(row['video'])
-        })
-    
-    # Insert in batches
+    # Prepare columns once (no per-row pandas boxing)
+    num_rows = len(meta_df)
+    frame_ids = meta_df['frame_id'].to_numpy(dtype=np.int64).tolist()
+    paths = meta_df['keyframe_path'].astype(str).tolist()
+    videos = meta_df['video'].astype(str).tolist()
+    
+    # Insert in batches; row dicts are built per batch from column slices
     batch_size = 1000
     total_inserted = 0
     
-    for i in range(0, len(data), batch_size):
-        batch = data[i:i+batch_size]
+    for i in range(0, num_rows, batch_size):
+        end = min(i + batch_size, num_rows)
+        batch = [
+            {"frame_id": frame_ids[j], "vector": vectors[j], "keyframe_path": paths[j], "video": videos[j]}  # float32 row view; pymilvus accepts ndarray
+            for j in range(i, end)
+        ]
         client.insert(COLLECTION_NAME, batch)
         total_inserted += len(batch)
         if total_inserted % 10000 == 0:
-            print(f"  Inserted {total_inserted}/{len(data)} rows...")
+            print(f"  Inserted {total_inserted}/{num_rows} rows...")
     
     print(f"✅ {batch_id}: Inserted {total_inserted} rows")
     return total_inserted
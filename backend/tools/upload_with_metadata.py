@@ -59,9 +59,9 @@ def create_collection(client):
     index_params = client.prepare_index_params()
     index_params.add_index(
         field_name="vector",
-        index_type="IVF_FLAT",
+        index_type="HNSW",
         metric_type="COSINE",
-        params={"nlist": 1024}
+        params={"M": 24, "efConstruction": 200}
     )
     client.create_index(COLLECTION_NAME, index_params)
     print("✅ Collection created")
@@ -78,7 +78,7 @@ def upload_batch(client, batch_id, vectors_file):
         return 0
     
     # Load vectors
-    vectors = np.load(vectors_file)
+    vectors = np.load(vectors_file).astype(np.float32, copy=False)
     
     # Match counts
     if len(vectors) != len(meta_df):
@@ -90,26 +90,26 @@ def upload_batch(client, batch_id, vectors_file):
     
     print(f"Uploading {len(vectors)} vectors...")
     
-    # Prepare data
-    data = []
-    for idx in range(len(meta_df)):
-        data.append({
-            "frame_id": int(meta_df.iloc[idx]['frame_id']),
-            "vector": vectors[idx].tolist(),
-            "keyframe_path": str(meta_df.iloc[idx]['keyframe_path']),
-            "video": str(meta_df.iloc[idx]['video'])
-        })
-    
-    # Insert in batches
+    # Prepare columns once (no per-row .iloc lookups)
+    num_rows = len(meta_df)
+    frame_ids = meta_df['frame_id'].to_numpy(dtype=np.int64).tolist()
+    paths = meta_df['keyframe_path'].astype(str).tolist()
+    videos = meta_df['video'].astype(str).tolist()
+    
+    # Insert in batches; row dicts are built per batch from column slices
     batch_size = 1000
-    for i in range(0, len(data), batch_size):
-        batch = data[i:i+batch_size]
+    for i in range(0, num_rows, batch_size):
+        end = min(i + batch_size, num_rows)
+        batch = [
+            {"frame_id": frame_ids[j], "vector": vectors[j], "keyframe_path": paths[j], "video": videos[j]}  # float32 row view; pymilvus accepts ndarray
+            for j in range(i, end)
+        ]
         client.insert(COLLECTION_NAME, batch)
         if (i+batch_size) % 10000 == 0:
-            print(f"  Inserted {i+batch_size}/{len(data)}...")
+            print(f"  Inserted {i+batch_size}/{num_rows}...")
     
-    print(f"✅ {batch_id}: {len(data)} vectors uploaded")
-    return len(data)
+    print(f"✅ {batch_id}: {num_rows} vectors uploaded")
+    return num_rows
 
 def main():
     print("="*60)
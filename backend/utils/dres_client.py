@@ -3,7 +3,7 @@ DRES (Digital Repository Evaluation System) Client for AI Challenge 2024.
 Handles authentication, result formatting, and submission to DRES evaluation server.
 """
 
-import requests
+import httpx
 from typing import List, Optional, Dict, Any
 import logging
 
@@ -44,7 +44,8 @@ class DRESClient:
         password: Optional[str] = None,
         session_id: Optional[str] = None,
         fps: float = DEFAULT_FPS,
-        timeout: int = 15
+        timeout: int = 15,
+        client: Optional[httpx.AsyncClient] = None
     ):
         """
         Initialize DRES client.
@@ -56,6 +57,7 @@ class DRESClient:
             session_id: Pre-existing session ID (optional, will login if not provided)
             fps: Default FPS for timestamp conversion (default: 25.0)
             timeout: Request timeout in seconds (default: 15)
+            client: Shared httpx.AsyncClient (optional, a private one is created if not provided)
         """
         self.base_url = base_url.rstrip('/')
         self.username = username
@@ -65,10 +67,19 @@ class DRESClient:
         self.timeout = timeout
         self.logger = logging.getLogger(__name__)
         
+        # Reuse the caller's connection pool when given; otherwise own (and close) one
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(timeout=timeout)
+        
         # Cache for evaluation ID
         self._evaluation_id: Optional[str] = None
     
-    def login(self) -> str:
+    async def aclose(self) -> None:
+        """Close the HTTP client if this instance created it"""
+        if self._owns_client:
+            await self.client.aclose()
+    
+    async def login(self) -> str:
         """
         Login to DRES and get session ID.
         
@@ -92,7 +103,7 @@ class DRESClient:
         payload = {"username": self.username, "password": self.password}
         
         try:
-            resp = requests.post(login_url, json=payload, timeout=self.timeout)
+            resp = await self.client.post(login_url, json=payload, timeout=self.timeout)
             resp.raise_for_status()
             
             data = resp.json()
@@ -106,17 +117,17 @@ class DRESClient:
             self.logger.info(f"Login successful. Session ID: {sid[:20]}...")
             return sid
             
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Login failed: HTTP {getattr(e.response, 'status_code', 'N/A')}"
+        except httpx.HTTPError as e:
+            error_msg = f"Login failed: HTTP {getattr(getattr(e, 'response', None), 'status_code', 'N/A')}"
             try:
-                if hasattr(e, 'response') and e.response:
+                if getattr(e, 'response', None) is not None:
                     error_detail = e.response.json()
                     error_msg += f" - {error_detail}"
             except:
                 error_msg += f" - {str(e)}"
             raise RuntimeError(error_msg) from e
     
-    def get_active_evaluation(self, session_id: Optional[str] = None) -> str:
+    async def get_active_evaluation(self, session_id: Optional[str] = None) -> str:
         """
         Get active evaluation ID from DRES.
         
@@ -133,12 +144,12 @@ class DRESClient:
             return self._evaluation_id
         
         if not session_id:
-            session_id = self.session_id or self.login()
+            session_id = self.session_id or await self.login()
         
         url = f"{self.base_url}/api/v2/client/evaluation/list"
         
         try:
-            resp = requests.get(
+            resp = await self.client.get(
                 url,
                 params={"session": session_id},
                 timeout=self.timeout
@@ -161,10 +172,10 @@ class DRESClient:
             self.logger.info(f"Found active evaluation ID: {eval_id}")
             return eval_id
             
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Get evaluation list failed: HTTP {getattr(e.response, 'status_code', 'N/A')}"
+        except httpx.HTTPError as e:
+            error_msg = f"Get evaluation list failed: HTTP {getattr(getattr(e, 'response', None), 'status_code', 'N/A')}"
             try:
-                if hasattr(e, 'response') and e.response:
+                if getattr(e, 'response', None) is not None:
                     error_detail = e.response.text
                     error_msg += f" - {error_detail}"
             except:
@@ -251,7 +262,7 @@ class DRESClient:
             # Default format: use question as answer prefix
             return f"{question}-{media_item_name}-{timestamp_ms}"
     
-    def submit_kis(
+    async def submit_kis(
         self,
         results: List[Dict[str, Any]],
         session_id: Optional[str] = None,
@@ -271,10 +282,10 @@ class DRESClient:
             DRES submission response
         """
         if not session_id:
-            session_id = self.session_id or self.login()
+            session_id = self.session_id or await self.login()
         
         if not evaluation_id:
-            evaluation_id = self.get_active_evaluation(session_id)
+            evaluation_id = await self.get_active_evaluation(session_id)
         
         # Format results
         formatted_answers = []
@@ -302,7 +313,7 @@ class DRESClient:
         url = f"{self.base_url}/api/v2/submit/{evaluation_id}"
         
         try:
-            resp = requests.post(
+            resp = await self.client.post(
                 url,
                 params={"session": session_id},
                 json=body,
@@ -314,17 +325,17 @@ class DRESClient:
             self.logger.info(f"DRES KIS submission successful: {len(formatted_answers)} results")
             return response_data
             
-        except requests.exceptions.RequestException as e:
-            error_msg = f"DRES submission failed: HTTP {getattr(e.response, 'status_code', 'N/A')}"
+        except httpx.HTTPError as e:
+            error_msg = f"DRES submission failed: HTTP {getattr(getattr(e, 'response', None), 'status_code', 'N/A')}"
             try:
-                if hasattr(e, 'response') and e.response:
+                if getattr(e, 'response', None) is not None:
                     error_detail = e.response.json().get("description", e.response.text)
                     error_msg += f" - {error_detail}"
             except:
                 error_msg += f" - {str(e)}"
             raise RuntimeError(error_msg) from e
     
-    def submit_qa(
+    async def submit_qa(
         self,
         result: Dict[str, Any],
         question: str,
@@ -346,10 +357,10 @@ class DRESClient:
             DRES submission response
         """
         if not session_id:
-            session_id = self.session_id or self.login()
+            session_id = self.session_id or await self.login()
         
         if not evaluation_id:
-            evaluation_id = self.get_active_evaluation(session_id)
+            evaluation_id = await self.get_active_evaluation(session_id)
         
         # Format Q&A result
         try:
@@ -372,7 +383,7 @@ class DRESClient:
         url = f"{self.base_url}/api/v2/submit/{evaluation_id}"
         
         try:
-            resp = requests.post(
+            resp = await self.client.post(
                 url,
                 params={"session": session_id},
                 json=body,
@@ -384,17 +395,17 @@ class DRESClient:
             self.logger.info(f"DRES Q&A submission successful")
             return response_data
             
-        except requests.exceptions.RequestException as e:
-            error_msg = f"DRES submission failed: HTTP {getattr(e.response, 'status_code', 'N/A')}"
+        except httpx.HTTPError as e:
+            error_msg = f"DRES submission failed: HTTP {getattr(getattr(e, 'response', None), 'status_code', 'N/A')}"
             try:
-                if hasattr(e, 'response') and e.response:
+                if getattr(e, 'response', None) is not None:
                     error_detail = e.response.json().get("description", e.response.text)
                     error_msg += f" - {error_detail}"
             except:
                 error_msg += f" - {str(e)}"
             raise RuntimeError(error_msg) from e
     
-    def submit_batch(
+    async def submit_batch(
         self,
         results: List[Dict[str, Any]],
         question_type: str = "kis",
@@ -422,14 +433,14 @@ class DRESClient:
                 raise ValueError("Question is required for Q&A submission")
             if len(results) > 1:
                 self.logger.warning("Q&A submission typically uses single result, using first result")
-            return self.submit_qa(
+            return await self.submit_qa(
                 results[0],
                 question,
                 session_id=session_id,
                 evaluation_id=evaluation_id
             )
         else:
-            return self.submit_kis(
+            return await self.submit_kis(
                 results,
                 session_id=session_id,
                 evaluation_id=evaluation_id,
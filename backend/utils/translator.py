@@ -6,6 +6,10 @@ Translates Vietnamese queries to English for better CLIP/embedding performance
 import logging
 import os
 import json
+import time
+import sqlite3
+import hashlib
+import threading
 from pathlib import Path
 from typing import Optional
 import re
@@ -20,11 +24,25 @@ except ImportError:
     GOOGLE_TRANS_AVAILABLE = False
 
 try:
+    import torch
     from transformers import MarianMTModel, MarianTokenizer
     MARIAN_AVAILABLE = True
 except ImportError:
     MARIAN_AVAILABLE = False
 
+try:
+    import numpy as np
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 # Vietnamese word segmentation
 try:
     from underthesea import word_tokenize
@@ -51,6 +69,100 @@ except Exception:
     CRITICAL_KEYWORDS = {}
 
 
+MARIAN_MODEL_NAME = "Helsinki-NLP/opus-mt-vi-en"
+_marian = None
+_marian_lock = threading.Lock()
+
+def _load_marian():
+    """Load the Marian model once per process; every QueryTranslator shares it
+
+    On CUDA the weights are cast to fp16, halving the bytes moved per generate step.
+    """
+    global _marian
+    with _marian_lock:
+        if _marian is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            tokenizer = MarianTokenizer.from_pretrained(MARIAN_MODEL_NAME)
+            model = MarianMTModel.from_pretrained(MARIAN_MODEL_NAME).to(device).eval()
+            if device == "cuda":
+                model = model.half()
+            _marian = (tokenizer, model)
+    return _marian
+
+
+def _build_automaton(patterns):
+    """Aho-Corasick DFA over UTF-8 bytes for a list of byte patterns
+
+    Returns (delta[state, byte] -> state, out_term[state], out_link[state], lengths):
+    out_term is the pattern ending at a state (-1 if none), out_link the next state
+    along the fail chain that ends a pattern (-1 if none). Pattern ids are list indices;
+    a repeated pattern keeps its first id.
+    """
+    children = [{}]
+    out_term = [-1]
+    for term_id, pattern in enumerate(patterns):
+        node = 0
+        for byte in pattern:
+            nxt = children[node].get(byte)
+            if nxt is None:
+                nxt = len(children)
+                children[node][byte] = nxt
+                children.append({})
+                out_term.append(-1)
+            node = nxt
+        if out_term[node] == -1:
+            out_term[node] = term_id
+
+    n_states = len(children)
+    fail = [0] * n_states
+    out_link = [-1] * n_states
+    delta = np.zeros((n_states, 256), dtype=np.int32)
+    # BFS order guarantees fail[u] (a shallower state) is complete before u
+    queue = [0]
+    for u in queue:
+        if u:
+            delta[u] = delta[fail[u]]
+        for byte, v in children[u].items():
+            if u:
+                fail[v] = delta[fail[u], byte]
+                f = fail[v]
+                out_link[v] = f if out_term[f] != -1 else out_link[f]
+            delta[u, byte] = v
+            queue.append(v)
+    lengths = np.array([len(p) for p in patterns], dtype=np.int32)
+    return delta, np.array(out_term, dtype=np.int32), np.array(out_link, dtype=np.int32), lengths
+
+def _scan_automaton(buf, delta, out_term, out_link, lengths):
+    """All pattern occurrences in buf as (starts, ends, term_ids), in order of end position"""
+    count = 0
+    state = 0
+    for i in range(buf.shape[0]):
+        state = delta[state, buf[i]]
+        s = state if out_term[state] != -1 else out_link[state]
+        while s != -1:
+            count += 1
+            s = out_link[s]
+    starts = np.empty(count, np.int32)
+    ends = np.empty(count, np.int32)
+    terms = np.empty(count, np.int32)
+    k = 0
+    state = 0
+    for i in range(buf.shape[0]):
+        state = delta[state, buf[i]]
+        s = state if out_term[state] != -1 else out_link[state]
+        while s != -1:
+            t = out_term[s]
+            ends[k] = i + 1
+            starts[k] = i + 1 - lengths[t]
+            terms[k] = t
+            k += 1
+            s = out_link[s]
+    return starts, ends, terms
+
+if NUMBA_AVAILABLE:
+    _scan_automaton = njit(cache=True)(_scan_automaton)
+
+
 class TimeoutException(Exception):
     """Custom exception for translation timeout"""
     pass
@@ -90,7 +202,10 @@ class QueryTranslator:
         # Persistent Cache Setup
         self.cache_dir = Path(os.path.join(os.path.dirname(__file__), "..", "data", "cache")).absolute()
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self.persistent_cache_file = self.cache_dir / "translations.json"
+        self.persistent_cache_file = self.cache_dir / "translations.db"
+        self.legacy_cache_file = self.cache_dir / "translations.json"
+        self._db = None
+        self._db_lock = threading.Lock()
         self._load_persistent_cache()
         
         # Load DRES dictionary
@@ -102,6 +217,7 @@ class QueryTranslator:
             self.exact_queries = {}
             self.keywords = {}
             self.logger.warning("DRES dictionary not available")
+        self._build_keyword_matcher()
         
         # Initialize backend
         if backend == 'auto':
@@ -121,33 +237,148 @@ class QueryTranslator:
         self.logger.info(f"QueryTranslator initialized with backend: {self.backend}")
 
     def _load_persistent_cache(self):
-        """Load translations from disk"""
-        if self.persistent_cache_file.exists():
-            try:
-                with open(self.persistent_cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.cache.update(data)
-                    self.logger.info(f"Loaded {len(data)} translations from persistent cache")
-            except Exception as e:
-                self.logger.warning(f"Failed to load persistent translation cache: {e}")
+        """Open the SQLite translation memory (WAL mode: readers never block the writer)
 
-    def _save_persistent_cache(self):
-        """Save translations to disk"""
+        Rows are read on demand, so startup does not load the whole cache into memory.
+        """
         try:
-            with open(self.persistent_cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            self._db = sqlite3.connect(str(self.persistent_cache_file), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS tm(h BLOB PRIMARY KEY, src TEXT, tgt TEXT, ts REAL)")
+            self._db.commit()
+            if self.legacy_cache_file.exists() and self._db.execute("SELECT 1 FROM tm LIMIT 1").fetchone() is None:
+                self._migrate_legacy_cache()
+        except Exception as e:
+            self.logger.warning(f"Failed to open persistent translation cache: {e}")
+            self._db = None
+
+    def _migrate_legacy_cache(self):
+        """One-time import of the old translations.json cache"""
+        try:
+            with open(self.legacy_cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            rows = [(self._hash(k[len("query_"):]), k[len("query_"):], v, now) for k, v in data.items() if k.startswith("query_")]
+            with self._db_lock:
+                self._db.executemany("INSERT OR IGNORE INTO tm VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+            self.logger.info(f"Migrated {len(rows)} translations from {self.legacy_cache_file.name}")
+        except Exception as e:
+            self.logger.warning(f"Failed to migrate legacy translation cache: {e}")
+
+    @staticmethod
+    def _hash(query: str) -> bytes:
+        return hashlib.sha256(query.encode('utf-8')).digest()
+
+    def _get_persistent(self, query: str) -> Optional[str]:
+        """Look up one translation on disk"""
+        if self._db is None: return None
+        try:
+            with self._db_lock:
+                row = self._db.execute("SELECT tgt FROM tm WHERE h = ?", (self._hash(query),)).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            self.logger.warning(f"Failed to read persistent translation cache: {e}")
+            return None
+
+    def _save_persistent(self, query: str, result: str):
+        """Insert one translation (O(log N) B-tree insert instead of rewriting the whole cache)"""
+        if self._db is None: return
+        try:
+            with self._db_lock:
+                self._db.execute("INSERT OR IGNORE INTO tm VALUES (?, ?, ?, ?)", (self._hash(query), query, result, time.time()))
+                self._db.commit()
         except Exception as e:
             self.logger.warning(f"Failed to save persistent translation cache: {e}")
     
+    def _build_keyword_matcher(self):
+        """Precompute the longest-first keyword order and, with numba, its Aho-Corasick DFA"""
+        self._sorted_keywords = sorted(self.keywords.items(), key=lambda x: len(x[0]), reverse=True)
+        self._automaton = None
+        self._ac_automaton = None
+        if not self._sorted_keywords:
+            return
+        if NUMBA_AVAILABLE:
+            try:
+                patterns = [vi.lower().encode('utf-8') for vi, _ in self._sorted_keywords]
+                self._automaton = _build_automaton(patterns)
+                _scan_automaton(np.frombuffer(patterns[0], dtype=np.uint8), *self._automaton)  # JIT warmup
+                return
+            except Exception as e:
+                self.logger.warning(f"Keyword automaton unavailable: {e}")
+                self._automaton = None
+        if AHOCORASICK_AVAILABLE:
+            # C-implemented automaton: no JIT warmup, same longest-first ranks as values
+            automaton = ahocorasick.Automaton()
+            for rank, (vi_term, _) in enumerate(self._sorted_keywords):
+                vi_term_lower = vi_term.lower()
+                if vi_term_lower and vi_term_lower not in automaton:
+                    automaton.add_word(vi_term_lower, (rank, len(vi_term_lower)))
+            automaton.make_automaton()
+            self._ac_automaton = automaton
+
+    def match_keywords(self, query_lower: str) -> list:
+        """Keyword (vi, en) pairs found in a lowercased query, longest-match first
+
+        A term is skipped where it overlaps text already claimed by a longer term.
+        """
+        if self._automaton is not None:
+            buf = query_lower.encode('utf-8')
+            starts, ends, terms = _scan_automaton(np.frombuffer(buf, dtype=np.uint8), *self._automaton)
+            # Term ids are ranks in longest-first order; per term, walk occurrences left to right
+            order = np.lexsort((starts, terms))
+            hits = zip(terms[order].tolist(), starts[order].tolist(), ends[order].tolist())
+            return self._claim_matches(hits, len(buf))
+        if self._ac_automaton is not None:
+            hits = sorted((rank, end + 1 - length, end + 1) for end, (rank, length) in self._ac_automaton.iter(query_lower))
+            return self._claim_matches(hits, len(query_lower))
+        return self._match_keywords_regex(query_lower)
+
+    def _claim_matches(self, hits, size: int) -> list:
+        """Greedily claim (rank, start, end) hits, sorted by rank then start, on a span mask"""
+        consumed = bytearray(size)
+        next_from = {}
+        matched = []
+        for t, start, end in hits:
+            # Same non-overlapping occurrences re.finditer would yield for this term
+            if start < next_from.get(t, 0): continue
+            next_from[t] = end
+            if consumed.find(1, start, end) != -1: continue
+            consumed[start:end] = b'\x01' * (end - start)
+            matched.append(self._sorted_keywords[t])
+        return matched
+
+    def _match_keywords_regex(self, query_lower: str) -> list:
+        """Pure-Python fallback for match_keywords"""
+        matched = []
+        # TRACK CONSUMED RANGES to prevent sub-string matching
+        consumed_indices = set()
+        for vi_term, en_term in self._sorted_keywords:
+            vi_term_lower = vi_term.lower()
+            
+            # Use regex to find all occurrences of the term
+            # This handles cases where a term appears multiple times
+            for match in re.finditer(re.escape(vi_term_lower), query_lower):
+                start, end = match.start(), match.end()
+                
+                # Check if this range overlaps with any consumed indices
+                if any(i in consumed_indices for i in range(start, end)):
+                    continue
+                    
+                # Mark as consumed
+                for i in range(start, end):
+                    consumed_indices.add(i)
+                matched.append((vi_term, en_term))
+        return matched
+
     def _init_translator(self):
         """Initialize translation backend"""
         if self.backend == 'marian' and MARIAN_AVAILABLE:
-            model_name = "Helsinki-NLP/opus-mt-vi-en"
-            self.logger.info(f"Loading Marian model: {model_name}")
+            self.logger.info(f"Loading Marian model: {MARIAN_MODEL_NAME}")
             try:
-                self.tokenizer = MarianTokenizer.from_pretrained(model_name)
-                self.model = MarianMTModel.from_pretrained(model_name)
-                self.logger.info("Marian model loaded successfully")
+                self.tokenizer, self.model = _load_marian()
+                self.logger.info(f"Marian model loaded successfully ({self.model.device}, {self.model.dtype})")
             except Exception as e:
                 self.logger.error(f"Failed to load Marian: {e}")
                 self.backend = 'none'
@@ -215,8 +446,9 @@ class QueryTranslator:
                 return result.text
                 
             elif self.backend == 'marian':
-                inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-                outputs = self.model.generate(**inputs, max_length=512)
+                inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512).to(self.model.device)
+                with torch.inference_mode():
+                    outputs = self.model.generate(**inputs, max_length=512)
                 return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
             
             return text
@@ -248,36 +480,16 @@ class QueryTranslator:
             
             # 2. Visual Anchor Extraction (Longest-Match First with Range Tracking)
             anchors_found = []
-            # Sort keywords by length (longest first)
-            sorted_keywords = sorted(self.keywords.items(), key=lambda x: len(x[0]), reverse=True)
             
             # Lowercase query for matching
             query_lower = query.lower()
             translated_lower = direct_translated.lower()
             
-            # TRACK CONSUMED RANGES to prevent sub-string matching
-            consumed_indices = set()
-            
-            for vi_term, en_term in sorted_keywords:
-                vi_term_lower = vi_term.lower()
-                
-                # Use regex to find all occurrences of the term
-                # This handles cases where a term appears multiple times
-                for match in re.finditer(re.escape(vi_term_lower), query_lower):
-                    start, end = match.start(), match.end()
-                    
-                    # Check if this range overlaps with any consumed indices
-                    if any(i in consumed_indices for i in range(start, end)):
-                        continue
-                        
-                    # Mark as consumed
-                    for i in range(start, end):
-                        consumed_indices.add(i)
-                    
-                    # Check if the English equivalent is already in the MT result
-                    # Only add if it's a "Missing Link" visual anchor
-                    if en_term.lower() not in translated_lower:
-                        anchors_found.append(en_term)
+            for vi_term, en_term in self.match_keywords(query_lower):
+                # Check if the English equivalent is already in the MT result
+                # Only add if it's a "Missing Link" visual anchor
+                if en_term.lower() not in translated_lower:
+                    anchors_found.append(en_term)
             
             # 3. Semantic Merging
             if anchors_found:
@@ -314,10 +526,14 @@ class QueryTranslator:
         if not query or not query.strip():
             return query
         
-        # Check cache
+        # Check cache (memory, then translation memory on disk)
         cache_key = f"query_{query}"
         if cache_key in self.cache:
             return self.cache[cache_key]
+        persisted = self._get_persistent(query)
+        if persisted is not None:
+            self._remember(cache_key, persisted)
+            return persisted
         
         # Auto-detect Vietnamese
         if auto_detect and not self.is_vietnamese(query):
@@ -328,13 +544,17 @@ class QueryTranslator:
         result = self.translate_smart(query)
         
         # Cache result
+        self._remember(cache_key, result)
+        self._save_persistent(query, result)
+        
+        return result
+
+    def _remember(self, cache_key: str, result: str):
+        """Keep a translation in the bounded in-memory cache"""
         if len(self.cache) >= self.cache_size:
             # Remove oldest entry (FIFO)
             self.cache.pop(next(iter(self.cache)))
         self.cache[cache_key] = result
-        self._save_persistent_cache()
-        
-        return result
 
 
 # Singleton instance